@@ -0,0 +1,71 @@
+"""
+Tests for the lexical prefilter; run with: python -m pytest backend/services
+"""
+
+import pytest
+
+from toxicity_prefilter import LexicalPrefilter
+
+prefilter = LexicalPrefilter()
+
+
+@pytest.mark.parametrize('text', [
+    'thanks!',
+    'Thank you so much',
+    'ok 👍',
+    'Xin chào',
+    'cảm ơn nhé',
+    'tuyet voi',
+    '5',
+    '',
+])
+def test_trivial_texts_are_clean(text):
+    assert prefilter.classify(text)[0] == 'clean'
+
+
+@pytest.mark.parametrize('text', [
+    'fuck this tour',
+    'đồ chó',
+    'dcm',
+])
+def test_explicit_profanity_is_toxic(text):
+    assert prefilter.classify(text)[0] == 'toxic'
+
+
+@pytest.mark.parametrize('text', [
+    # Harmless words that start with, or contain, a profanity
+    'shiitake mushrooms',
+    'shitake risotto',
+    'Bitchin Lane, Ha Long',
+    'fuckinghamshire',
+    'Cocktails in Scunthorpe',
+    'The class was great',
+    'đĩa trái cây',
+])
+def test_harmless_words_are_not_profanity(text):
+    assert prefilter.classify(text)[0] != 'toxic'
+
+
+@pytest.mark.parametrize('text', ['fucking awful', 'shitty hotel', 'bitches', 'f*cking guide'])
+def test_profanity_endings_are_toxic(text):
+    assert prefilter.classify(text)[0] == 'toxic'
+
+
+@pytest.mark.parametrize('text', [
+    # Threats and insults in ordinary words, none of them in the lexicon
+    'I will hurt you badly',
+    'go to hell',
+    'You are a worthless piece of garbage and I hope your family burns',
+    'I know where you live',
+    'people like you should disappear',
+    'thang lua dao',
+    'mày liệu hồn đấy',
+    # Harmless, but not settled without the model
+    'The hotel was lovely and the staff were kind',
+])
+def test_everything_else_goes_to_the_model(text):
+    assert prefilter.classify(text)[0] is None
+
+
+def test_long_texts_go_to_the_model():
+    assert prefilter.classify('thanks ' * 10) == (None, 'long_text')
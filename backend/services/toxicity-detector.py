@@ -4,29 +4,128 @@ Toxicity Detection Service using Detoxify
 Provides toxic content detection for spam and harmful content filtering
 """
 
+import os
 import sys
 import json
+import time
 import logging
-from detoxify import Detoxify
+import queue
+import threading
+import socketserver
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import argparse
 
+from toxicity_backends import PARITY_CORPUS, available_backends, load_model
+from toxicity_backfill import parse_input_line, run_backfill
+from toxicity_batcher import MicroBatcher
+from toxicity_cache import ToxicityCache
+from toxicity_prefilter import DEFAULT_MAX_CLEAN_CHARS, LexicalPrefilter, PrefilterEvaluation
+from toxicity_router import LanguageRouter, parse_routes
+from toxicity_timing import NO_TIMING, StageTimer, TimedTokenizer
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TOXICITY_THRESHOLD = 0.3  # Adjustable threshold
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 10
+DEFAULT_CACHE_SIZE = 10000
+PREFILTER_TOXIC_SCORE = 0.9  # Reported toxicity for texts the prefilter flags as profanity
+
+class ModelLoadError(RuntimeError):
+    """The model could not be loaded; never reported as a per-text scoring error"""
+
 class ToxicityDetector:
-    def __init__(self, model_name='original'):
+    def __init__(self, model_name='original', batch_size=DEFAULT_BATCH_SIZE, cache=None,
+                 backend='torch', onnx_dir=None, prefilter=None,
+                 window_tokens=0, window_stride=None, window_aggregate='max', warm_dir=None,
+                 timer=None):
         """
         Initialize Detoxify model
+        The model is loaded on first use (or by load()), so calls that never
+        score anything don't pay for importing torch and loading weights.
         Available models: 'original', 'unbiased', 'multilingual'
+        batch_size: number of texts per forward pass in batch_detect
+        cache: optional ToxicityCache consulted before running the model
+        backend: 'torch', 'quantized' (dynamic int8) or 'onnx' (see toxicity_backends.py)
+        onnx_dir: exported model directory for the onnx backend
+        prefilter: optional LexicalPrefilter that settles obvious texts before the model;
+                   results then carry 'decided_by' ('prefilter' or 'model')
+        window_tokens: score texts longer than this many tokens as overlapping windows
+                       instead of letting the model truncate them (0 disables)
+        window_stride: tokens between window starts (default: 3/4 of the window)
+        window_aggregate: 'max' or 'mean' over the windows of one text
+        warm_dir: directory for warm-start model snapshots (see toxicity_backends.py)
+        timer: optional StageTimer recording per-stage timings (see toxicity_timing.py)
         """
-        try:
-            logger.info(f"Loading Detoxify model: {model_name}")
-            self.model = Detoxify(model_name)
-            logger.info("Detoxify model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load Detoxify model: {e}")
-            raise
+        if window_aggregate not in ('max', 'mean'):
+            raise ValueError(f"Unknown window aggregate: {window_aggregate}")
+        window_stride = window_stride or max(1, window_tokens * 3 // 4)
+        if window_tokens and not 0 < window_stride <= window_tokens:
+            raise ValueError('window_stride must be between 1 and window_tokens')
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = cache
+        self.backend = backend
+        self.prefilter = prefilter
+        self.stage_counts = Counter()
+        self.window_tokens = window_tokens
+        self.window_stride = window_stride
+        self.window_aggregate = window_aggregate
+        # Cache namespace: other backends and windowed scoring give different scores
+        self.variant = model_name if backend == 'torch' else f"{model_name}+{backend}"
+        if window_tokens:
+            self.variant += f"+w{window_tokens}s{window_stride}{window_aggregate}"
+
+        self.onnx_dir = onnx_dir
+        self.warm_dir = warm_dir
+        self.timer = timer
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self.load()
+        return self._model
+
+    def load(self):
+        """Load the model now instead of on first use (e.g. before serving or forking)"""
+        with self._load_lock:
+            if self._model is None:
+                try:
+                    logger.info(f"Loading Detoxify model: {self.model_name} ({self.backend} backend)")
+                    model = load_model(self.model_name, self.backend, self.onnx_dir, self.warm_dir)
+                    if self.timer is not None and hasattr(model, 'tokenizer'):
+                        model.tokenizer = TimedTokenizer(model.tokenizer, self.timer)
+                    self._model = model
+                    logger.info("Detoxify model loaded successfully")
+                except Exception as e:
+                    logger.error(f"Failed to load Detoxify model: {e}")
+                    raise ModelLoadError(str(e)) from e
+        return self
+
+    def stage(self, name):
+        """Context manager timing one stage; a shared no-op without a timer"""
+        return self.timer.stage(name) if self.timer is not None else NO_TIMING
+
+    def _predict(self, inputs):
+        """model.predict, timed as 'forward' minus the tokenizer's share when timing"""
+        if self.timer is None:
+            return self.model.predict(inputs)
+
+        model = self.model
+        started = time.perf_counter()
+        scores = model.predict(inputs)
+        elapsed = time.perf_counter() - started
+        if isinstance(model.tokenizer, TimedTokenizer):
+            elapsed -= model.tokenizer.take_seconds()
+        self.timer.record('forward', elapsed)
+        return scores
 
     def detect_toxicity(self, text):
         """
@@ -47,48 +146,59 @@ class ToxicityDetector:
         """
         try:
             if not text or not text.strip():
-                return {
-                    'toxicity': 0.0,
-                    'severe_toxicity': 0.0,
-                    'obscene': 0.0,
-                    'threat': 0.0,
-                    'insult': 0.0,
-                    'identity_attack': 0.0,
-                    'is_toxic': False,
-                    'max_score': 0.0,
-                    'toxic_type': 'none',
-                    'confidence': 0.0
-                }
+                return self._empty_result()
+
+            if self.window_tokens and len(text) > self.window_tokens:
+                return self.batch_detect([text])[0]
+
+            with self.stage('lookup'):
+                decision = cached = None
+                if self.prefilter is not None:
+                    decision, reason = self.prefilter.classify(text)
+                if decision is None and self.cache is not None:
+                    cached = self.cache.get(self.variant, text)
+
+            if decision is not None:
+                return self._prefilter_result(decision, reason)
+            if cached is not None:
+                return self._decided_by_model(cached)
 
             # Get toxicity scores
-            scores = self.model.predict(text)
-            
-            # Convert numpy types to Python types for JSON serialization
-            result = {}
-            for key, value in scores.items():
-                if hasattr(value, 'item'):  # numpy scalar
-                    result[key] = float(value.item())
-                else:
-                    result[key] = float(value)
-            
-            # Determine overall toxicity
-            toxicity_threshold = 0.3  # Adjustable threshold
-            max_score = max(result.values())
+            scores = self._predict(text)
             
-            # Find the most problematic category
-            toxic_type = 'none'
-            if max_score > toxicity_threshold:
-                toxic_type = max(result.items(), key=lambda x: x[1])[0]
-            
-            result.update({
-                'is_toxic': max_score > toxicity_threshold,
-                'max_score': max_score,
-                'toxic_type': toxic_type,
-                'confidence': max_score
-            })
+            with self.stage('convert'):
+                # Convert numpy types to Python types for JSON serialization
+                result = {}
+                for key, value in scores.items():
+                    if hasattr(value, 'item'):  # numpy scalar
+                        result[key] = float(value.item())
+                    else:
+                        result[key] = float(value)
+                
+                # Determine overall toxicity
+                toxicity_threshold = TOXICITY_THRESHOLD
+                max_score = max(result.values())
+                
+                # Find the most problematic category
+                toxic_type = 'none'
+                if max_score > toxicity_threshold:
+                    toxic_type = max(result.items(), key=lambda x: x[1])[0]
+                
+                result.update({
+                    'is_toxic': max_score > toxicity_threshold,
+                    'max_score': max_score,
+                    'toxic_type': toxic_type,
+                    'confidence': max_score
+                })
+
+            if self.cache is not None:
+                with self.stage('cache_store'):
+                    self.cache.put(self.variant, text, result)
             
-            return result
+            return self._decided_by_model(result)
             
+        except ModelLoadError:
+            raise
         except Exception as e:
             logger.error(f"Error detecting toxicity: {e}")
             return {
@@ -97,30 +207,669 @@ class ToxicityDetector:
                 'confidence': 0.0
             }
 
-    def batch_detect(self, texts):
+    def _empty_result(self):
+        """Result for empty/blank text, which never reaches the model"""
+        return {
+            'toxicity': 0.0,
+            'severe_toxicity': 0.0,
+            'obscene': 0.0,
+            'threat': 0.0,
+            'insult': 0.0,
+            'identity_attack': 0.0,
+            'is_toxic': False,
+            'max_score': 0.0,
+            'toxic_type': 'none',
+            'confidence': 0.0
+        }
+
+    def _prefilter_result(self, decision, reason):
+        """Result for a text settled by the lexical prefilter"""
+        self.stage_counts[f"prefilter_{decision}"] += 1
+        result = self._empty_result()
+        if decision == 'toxic':
+            result.update({
+                'toxicity': PREFILTER_TOXIC_SCORE,
+                'is_toxic': True,
+                'max_score': PREFILTER_TOXIC_SCORE,
+                'toxic_type': 'toxicity',
+                'confidence': PREFILTER_TOXIC_SCORE
+            })
+        result.update({'decided_by': 'prefilter', 'prefilter_reason': reason})
+        return result
+
+    def _decided_by_model(self, result):
+        """Tag a model (or cached model) result when the cascade is enabled"""
+        if self.prefilter is not None:
+            self.stage_counts['model'] += 1
+            result['decided_by'] = 'model'
+        return result
+
+    def _results_from_matrix(self, class_names, matrix):
         """
-        Analyze multiple texts for toxicity
+        Build per-text results from a score matrix (rows are texts, columns are
+        categories in the same order as detect_toxicity) using array ops
         """
+        max_scores = matrix.max(axis=1)
+        is_toxic = max_scores > TOXICITY_THRESHOLD
+        toxic_types = np.where(is_toxic, np.array(class_names)[matrix.argmax(axis=1)], 'none')
+
         results = []
-        for text in texts:
-            result = self.detect_toxicity(text)
+        for row, max_score, toxic, toxic_type in zip(
+                matrix.tolist(), max_scores.tolist(), is_toxic.tolist(), toxic_types.tolist()):
+            result = dict(zip(class_names, row))
+            result.update({
+                'is_toxic': toxic,
+                'max_score': max_score,
+                'toxic_type': toxic_type,
+                'confidence': max_score
+            })
             results.append(result)
         return results
 
+    def _split_windows(self, texts):
+        """
+        Split texts longer than window_tokens into overlapping token windows.
+        Returns (windows, window count per text); short texts stay a single window.
+        """
+        tokenizer = self.model.tokenizer
+        windows, counts = [], []
+
+        for text in texts:
+            # A token covers at least one character, so short texts can't overflow
+            if len(text) <= self.window_tokens:
+                windows.append(text)
+                counts.append(1)
+                continue
+
+            ids = tokenizer.encode(text, add_special_tokens=False)
+            if len(ids) <= self.window_tokens:
+                windows.append(text)
+                counts.append(1)
+                continue
+
+            starts = list(range(0, len(ids) - self.window_tokens + 1, self.window_stride))
+            if starts[-1] + self.window_tokens < len(ids):
+                starts.append(len(ids) - self.window_tokens)
+
+            windows.extend(tokenizer.decode(ids[start:start + self.window_tokens]) for start in starts)
+            counts.append(len(starts))
+
+        return windows, counts
+
+    def _score_texts(self, texts, batch_size):
+        """
+        Score non-empty texts, one result per text. All windows of all texts are
+        run through the model together in chunks of batch_size, then aggregated
+        per text with max or mean.
+        """
+        if not texts:
+            # Everything was empty, prefiltered or cached; don't load the model for the tokenizer
+            return []
+
+        if self.window_tokens:
+            with self.stage('windows'):
+                windows, counts = self._split_windows(texts)
+        else:
+            windows, counts = texts, [1] * len(texts)
+
+        class_names = None
+        blocks = []  # (rows, model scores or None if the chunk failed)
+        error = None
+        for start in range(0, len(windows), batch_size):
+            chunk = windows[start:start + batch_size]
+            try:
+                scores = self._predict(chunk)
+            except ModelLoadError:
+                raise
+            except Exception as e:
+                logger.error(f"Error detecting toxicity: {e}")
+                error = str(e)
+                blocks.append((len(chunk), None))
+                continue
+            class_names = list(scores.keys())
+            blocks.append((len(chunk), scores))
+
+        error_result = {'error': error, 'is_toxic': False, 'confidence': 0.0}
+        if class_names is None:
+            return [dict(error_result) for _ in texts]
+
+        with self.stage('convert'):
+            # Failed chunks become NaN rows, which poison every text they belong to
+            matrix = np.vstack([
+                np.array([scores[name] for name in class_names], dtype=np.float64).T
+                if scores is not None else np.full((rows, len(class_names)), np.nan)
+                for rows, scores in blocks
+            ])
+            starts = np.cumsum([0] + counts[:-1])
+            if self.window_aggregate == 'mean':
+                per_text = np.add.reduceat(matrix, starts, axis=0) / np.array(counts, dtype=np.float64)[:, None]
+            else:
+                per_text = np.maximum.reduceat(matrix, starts, axis=0)
+
+            failed = np.isnan(per_text).any(axis=1)
+            scored = iter(self._results_from_matrix(class_names, per_text[~failed]))
+
+            results = []
+            for count, text_failed in zip(counts, failed.tolist()):
+                if text_failed:
+                    results.append(dict(error_result))
+                    continue
+                result = next(scored)
+                if count > 1:
+                    result['windows'] = count
+                results.append(result)
+        return results
+
+    def batch_detect(self, texts, batch_size=None):
+        """
+        Analyze multiple texts for toxicity
+
+        Non-empty texts are scored in chunks of batch_size, one forward pass per chunk.
+        Empty texts short-circuit exactly like detect_toxicity. With window_tokens set,
+        long texts are scored as overlapping windows (see _score_texts).
+        """
+        batch_size = batch_size or self.batch_size
+        results = [None] * len(texts)
+        pending = []
+
+        with self.stage('lookup'):
+            for index, text in enumerate(texts):
+                if not isinstance(text, str):
+                    # Keep detect_toxicity's handling of unexpected input types
+                    results[index] = self.detect_toxicity(text)
+                elif not text.strip():
+                    results[index] = self._empty_result()
+                else:
+                    decision, reason = self.prefilter.classify(text) if self.prefilter is not None else (None, None)
+                    cached = None
+                    if decision is None and self.cache is not None:
+                        cached = self.cache.get(self.variant, text)
+
+                    if decision is not None:
+                        results[index] = self._prefilter_result(decision, reason)
+                    elif cached is not None:
+                        results[index] = self._decided_by_model(cached)
+                    else:
+                        pending.append(index)
+
+        # Score each distinct text once, even if it repeats within the batch
+        unique_texts = list(dict.fromkeys(texts[index] for index in pending))
+        scored = dict(zip(unique_texts, self._score_texts(unique_texts, batch_size)))
+        if self.cache is not None:
+            with self.stage('cache_store'):
+                self.cache.put_many(self.variant, scored.items())
+
+        for index in pending:
+            results[index] = self._decided_by_model(dict(scored[texts[index]]))
+
+        return results
+
+    def stats(self):
+        """Snapshot of detector-level statistics"""
+        return {
+            'model': self.model_name,
+            'backend': self.backend,
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'stages': dict(self.stage_counts) if self.prefilter is not None else None,
+            'timing': self.timer.snapshot() if self.timer is not None else None
+        }
+
+class RoutedToxicityDetector:
+    def __init__(self, router, **options):
+        """
+        Keep one ToxicityDetector per routed model resident in this process
+        router: LanguageRouter choosing the model for each text
+        options: ToxicityDetector arguments shared by every model (cache, backend, ...);
+                 the cache is namespaced per model, so sharing it is safe
+        """
+        self.router = router
+        self.detectors = {}
+        for model_name in dict.fromkeys(router.routes.values()):
+            self.detectors[model_name] = ToxicityDetector(model_name, **options)
+
+        self.batch_size = options.get('batch_size', DEFAULT_BATCH_SIZE)
+        self.timer = options.get('timer')
+        self._route_stats = {model_name: Counter() for model_name in self.detectors}
+        self._stats_lock = threading.Lock()
+
+    def load(self):
+        """Load every routed model now instead of on first use"""
+        for detector in self.detectors.values():
+            detector.load()
+        return self
+
+    def stage(self, name):
+        return self.timer.stage(name) if self.timer is not None else NO_TIMING
+
+    def detect_toxicity(self, text):
+        return self.batch_detect([text])[0]
+
+    def batch_detect(self, texts, batch_size=None):
+        """
+        Split a mixed batch by route so each model gets a full batch of its own
+        texts, then put the results back in input order tagged with 'routed_to'
+        """
+        routes = {}
+        for index, text in enumerate(texts):
+            routes.setdefault(self.router.route(text), []).append(index)
+
+        results = [None] * len(texts)
+        for model_name, indices in routes.items():
+            started = time.perf_counter()
+            routed = self.detectors[model_name].batch_detect([texts[i] for i in indices], batch_size)
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+            with self._stats_lock:
+                counts = self._route_stats[model_name]
+                counts['texts'] += len(indices)
+                counts['batches'] += 1
+                counts['total_ms'] += elapsed_ms
+
+            for index, result in zip(indices, routed):
+                result['routed_to'] = model_name
+                results[index] = result
+
+        return results
+
+    def stats(self):
+        """Per-route counts and latencies plus each model's own statistics"""
+        with self._stats_lock:
+            routes = {}
+            for model_name, counts in self._route_stats.items():
+                routes[model_name] = {
+                    'texts': counts['texts'],
+                    'batches': counts['batches'],
+                    'total_ms': float(counts['total_ms']),
+                    'mean_batch_ms': counts['total_ms'] / counts['batches'] if counts['batches'] else 0.0,
+                    'mean_text_ms': counts['total_ms'] / counts['texts'] if counts['texts'] else 0.0
+                }
+        models = {}
+        for model_name, detector in self.detectors.items():
+            # The timer is shared by every model, so it is reported once below
+            models[model_name] = {key: value for key, value in detector.stats().items() if key != 'timing'}
+        return {
+            'routes': self.router.routes,
+            'route_stats': routes,
+            'models': models,
+            'timing': self.timer.snapshot() if self.timer is not None else None
+        }
+
+def handle_request(detector, batcher, request):
+    """
+    Handle one daemon request and return the response dict.
+    Texts are scored through the shared micro-batcher, so concurrent requests
+    end up in the same forward pass.
+
+    Requests: {"id": ..., "text": str} | {"id": ..., "texts": [str]}
+              | {"id": ..., "command": "ping" | "stats" | "shutdown"}
+    """
+    if not isinstance(request, dict):
+        return {'id': None, 'error': 'Request must be a JSON object'}
+
+    response = {'id': request.get('id')}
+    command = request.get('command')
+
+    try:
+        if command == 'ping':
+            response['status'] = 'ok'
+        elif command == 'stats':
+            response['stats'] = {'batcher': batcher.stats(), **detector.stats()}
+        elif command == 'shutdown':
+            response['status'] = 'shutting_down'
+        elif command is not None:
+            response['error'] = f"Unknown command: {command}"
+        elif 'texts' in request:
+            futures = batcher.submit_many(request['texts'] or [])
+            response['results'] = [future.result() for future in futures]
+        else:
+            response['result'] = batcher.submit(request.get('text', '')).result()
+    except Exception as e:
+        logger.error(f"Error handling request: {e}")
+        response['error'] = str(e)
+
+    return response
+
+def _parse_request_line(line):
+    """Decode one NDJSON request line, or return an error response"""
+    try:
+        return json.loads(line), None
+    except ValueError as e:
+        return None, {'id': None, 'error': f"Invalid JSON: {e}"}
+
+def serve_stdio(detector, batcher, max_concurrency):
+    """
+    Serve newline-delimited JSON requests on stdin, one response line per request.
+    Requests are handled concurrently, so responses may arrive out of order and
+    must be matched by id. Runs until stdin is closed or a shutdown command arrives.
+    """
+    write_lock = threading.Lock()
+
+    def write(response):
+        with detector.stage('json_encode'):
+            line = json.dumps(response, ensure_ascii=False)
+        with write_lock:
+            print(line, flush=True)
+
+    def handle(request):
+        write(handle_request(detector, batcher, request))
+
+    write({'status': 'ready'})
+
+    shutdown_request = None
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+
+            request, error = _parse_request_line(line)
+            if error:
+                write(error)
+            elif isinstance(request, dict) and request.get('command') == 'shutdown':
+                shutdown_request = request
+                break
+            else:
+                pool.submit(handle, request)
+
+    # Pool has drained every in-flight request at this point
+    if shutdown_request is not None:
+        write(handle_request(detector, batcher, shutdown_request))
+
+    logger.info("Toxicity daemon stopped")
+
+def stream_ndjson(detector, input_stream, output_stream, batch_size, max_wait_ms):
+    """
+    Score NDJSON input line by line and write one compact result line per input,
+    in input order, as soon as it is ready. At most two batches are queued,
+    so memory stays flat regardless of input size.
+
+    Input lines:  {"id": ..., "text": "..."}  or  "plain text"
+    Output lines: {"id": ..., "result": {...}}  or  {"id": ..., "error": "..."}
+    """
+    batcher = MicroBatcher(detector.batch_detect, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+    # (id, future) or (id, error message); the bound applies backpressure to the reader
+    pending = queue.Queue(maxsize=2 * batch_size)
+
+    def write_results():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+
+            item_id, outcome = item
+            if isinstance(outcome, str):
+                line = {'id': item_id, 'error': outcome}
+            else:
+                try:
+                    line = {'id': item_id, 'result': outcome.result()}
+                except Exception as e:
+                    line = {'id': item_id, 'error': str(e)}
+            with detector.stage('json_encode'):
+                encoded = json.dumps(line, ensure_ascii=False) + '\n'
+            output_stream.write(encoded)
+            output_stream.flush()
+
+    writer = threading.Thread(target=write_results, name='toxicity-stream-writer', daemon=True)
+    writer.start()
+
+    try:
+        for line_number, raw in enumerate(input_stream, 1):
+            if not raw.strip():
+                continue
+
+            try:
+                item_id, text = parse_input_line(raw, line_number)
+            except ValueError as e:
+                pending.put((line_number, f"Invalid JSON: {e}"))
+            else:
+                pending.put((item_id, batcher.submit(text)))
+    finally:
+        pending.put(None)
+        writer.join()
+        batcher.close()
+
+def evaluate_prefilter(detector, prefilter, input_stream, batch_size):
+    """
+    Run model-only scoring and the lexical prefilter side by side over NDJSON input.
+    Reports how often the prefilter agrees with the model and how much model work
+    it would skip.
+    """
+    evaluation = PrefilterEvaluation()
+
+    def flush(texts):
+        for text, model_result in zip(texts, detector.batch_detect(texts)):
+            decision, reason = prefilter.classify(text)
+            evaluation.add(text, decision, reason, model_result)
+
+    texts = []
+    for line_number, raw in enumerate(input_stream, 1):
+        if not raw.strip():
+            continue
+        try:
+            _, text = parse_input_line(raw, line_number)
+        except ValueError:
+            continue
+        if not isinstance(text, str) or not text.strip():
+            continue
+
+        texts.append(text)
+        if len(texts) >= batch_size:
+            flush(texts)
+            texts = []
+
+    if texts:
+        flush(texts)
+
+    return evaluation.report()
+
+def benchmark_windows(detector, lengths=(1000, 5000, 20000), texts_per_length=8, repeats=3):
+    """
+    Cost per 1k characters of long-text scoring, with the detector's window
+    settings versus plain truncation (window_tokens=0)
+    """
+    window_tokens = detector.window_tokens or 256
+    saved = (detector.cache, detector.prefilter, detector.window_tokens)
+    detector.cache, detector.prefilter = None, None
+
+    report = []
+    try:
+        for length in lengths:
+            base = ' '.join(PARITY_CORPUS)
+            text = (base * (length // len(base) + 1))[:length]
+            # Vary the texts so no layer can reuse work between them
+            texts = [f"{i} {text}" for i in range(texts_per_length)]
+
+            for mode, tokens in (('truncate', 0), ('windows', window_tokens)):
+                detector.window_tokens = tokens
+                detector.batch_detect(texts)  # warm-up
+                started = time.perf_counter()
+                for _ in range(repeats):
+                    results = detector.batch_detect(texts)
+                elapsed = (time.perf_counter() - started) / repeats
+
+                report.append({
+                    'mode': mode,
+                    'chars': length,
+                    'window_tokens': tokens,
+                    'windows_per_text': results[0].get('windows', 1),
+                    'ms_per_1k_chars': elapsed * 1000.0 / (length * len(texts) / 1000.0)
+                })
+    finally:
+        detector.cache, detector.prefilter, detector.window_tokens = saved
+
+    return report
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Newline-delimited JSON over a local TCP connection"""
+
+    def handle(self):
+        for raw_line in self.rfile:
+            line = raw_line.decode('utf-8').strip()
+            if not line:
+                continue
+
+            request, response = _parse_request_line(line)
+            if response is None:
+                response = handle_request(self.server.detector, self.server.batcher, request)
+
+            with self.server.detector.stage('json_encode'):
+                encoded = (json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8')
+            self.wfile.write(encoded)
+            self.wfile.flush()
+
+            if response.get('status') == 'shutting_down':
+                # shutdown() blocks until serve_forever returns, so call it off-thread
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def serve_tcp(detector, batcher, host, port):
+    """
+    Serve the same newline-delimited JSON protocol on a local TCP port.
+    Each connection is handled on its own thread; texts from all connections
+    share the micro-batcher.
+    """
+    with _DaemonServer((host, port), _DaemonRequestHandler) as server:
+        server.detector = detector
+        server.batcher = batcher
+        logger.info(f"Toxicity daemon listening on {host}:{port}")
+        server.serve_forever()
+
+    logger.info("Toxicity daemon stopped")
+
 def main():
     parser = argparse.ArgumentParser(description='Toxicity Detection Service')
     parser.add_argument('--text', type=str, help='Text to analyze')
     parser.add_argument('--batch', action='store_true', help='Process multiple texts from stdin')
+    parser.add_argument('--stream', action='store_true',
+                       help='Read NDJSON from stdin and write one result line per input as it is scored')
     parser.add_argument('--model', type=str, default='original', 
                        choices=['original', 'unbiased', 'multilingual'],
                        help='Detoxify model to use')
+    parser.add_argument('--route', action='store_true',
+                       help='Detect each text\'s language and score it with the model for that language')
+    parser.add_argument('--routes', type=str,
+                       help='Language to model map for --route, e.g. en=original,vi=multilingual,other=multilingual')
+    parser.add_argument('--backend', type=str, default='torch', choices=available_backends(),
+                       help='Inference backend (default: torch)')
+    parser.add_argument('--onnx-dir', type=str,
+                       help='Exported model directory for --backend onnx')
+    parser.add_argument('--model-cache-dir', type=str,
+                       default=os.environ.get('TOXICITY_MODEL_CACHE_DIR') or None,
+                       help='Keep a warm-start model snapshot in this private directory, '
+                            'outside the source tree (default: $TOXICITY_MODEL_CACHE_DIR, else off)')
+    parser.add_argument('--no-model-cache', action='store_true',
+                       help='Always build the model from the Detoxify checkpoint')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f'Texts per forward pass in batch mode (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--backfill', type=str, metavar='INPUT',
+                       help='Re-score an NDJSON file in parallel (resumable); requires --output')
+    parser.add_argument('--output', type=str, help='Output NDJSON file for --backfill')
+    parser.add_argument('--workers', type=int,
+                       help='Worker processes for --backfill (default: CPU count)')
+    parser.add_argument('--window-tokens', type=int, default=0,
+                       help='Score texts longer than this many tokens as overlapping windows (default: 0, off)')
+    parser.add_argument('--window-stride', type=int,
+                       help='Tokens between window starts (default: 3/4 of --window-tokens)')
+    parser.add_argument('--window-aggregate', type=str, default='max', choices=['max', 'mean'],
+                       help='How window scores combine into one result per text (default: max)')
+    parser.add_argument('--benchmark-windows', action='store_true',
+                       help='Report cost per 1k characters with and without windowed scoring')
+    parser.add_argument('--prefilter', action='store_true',
+                       help='Settle obvious texts with the lexical prefilter before running the model')
+    parser.add_argument('--prefilter-max-chars', type=int, default=DEFAULT_MAX_CLEAN_CHARS,
+                       help=f'Texts longer than this always go to the model (default: {DEFAULT_MAX_CLEAN_CHARS})')
+    parser.add_argument('--evaluate-prefilter', type=str, metavar='INPUT',
+                       help='Compare prefilter decisions with model-only scoring on an NDJSON file')
+    parser.add_argument('--serve', action='store_true',
+                       help='Keep the model loaded and serve NDJSON requests on stdin/stdout')
+    parser.add_argument('--port', type=int,
+                       help='With --serve, listen on this local TCP port instead of stdin/stdout')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                       help='Bind address for --port (default: 127.0.0.1)')
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help='With --serve, flush a micro-batch once it holds this many texts')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                       help=f'With --serve/--stream, flush a batch after this many ms (default: {DEFAULT_MAX_WAIT_MS})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                       help=f'Entries in the in-memory result cache, 0 disables caching (default: {DEFAULT_CACHE_SIZE})')
+    parser.add_argument('--cache-db', type=str,
+                       help='SQLite file for a persistent result cache shared across restarts')
+    parser.add_argument('--stats', action='store_true',
+                       help='Time each scoring stage; printed to stderr when done, or via the '
+                            'stats command with --serve (not collected from --backfill workers)')
     
     args = parser.parse_args()
+    if args.backfill and not args.output:
+        parser.error('--backfill requires --output')
+    if args.route and args.benchmark_windows:
+        parser.error('--benchmark-windows measures a single model; drop --route')
+    try:
+        routes = parse_routes(args.routes)
+    except ValueError as e:
+        parser.error(str(e))
     
     try:
-        detector = ToxicityDetector(args.model)
+        cache = None
+        # Workers are forked from the parent, so a backfill runs without the shared cache
+        if not args.backfill and (args.cache_size > 0 or args.cache_db):
+            cache = ToxicityCache(max_entries=args.cache_size, db_path=args.cache_db)
+
+        prefilter = LexicalPrefilter(max_clean_chars=args.prefilter_max_chars)
+        # The evaluation needs model-only scores, so the cascade stays off there
+        use_prefilter = args.prefilter and not args.evaluate_prefilter
+
+        options = dict(batch_size=args.batch_size, cache=cache,
+                       backend=args.backend, onnx_dir=args.onnx_dir,
+                       prefilter=prefilter if use_prefilter else None,
+                       window_tokens=args.window_tokens,
+                       window_stride=args.window_stride,
+                       window_aggregate=args.window_aggregate,
+                       warm_dir=None if args.no_model_cache else args.model_cache_dir,
+                       timer=StageTimer() if args.stats else None)
+        if args.route:
+            detector = RoutedToxicityDetector(LanguageRouter(routes), **options)
+        else:
+            detector = ToxicityDetector(args.model, **options)
         
-        if args.batch:
+        if args.benchmark_windows:
+            print(json.dumps(benchmark_windows(detector), indent=2))
+
+        elif args.evaluate_prefilter:
+            with open(args.evaluate_prefilter, 'r', encoding='utf-8') as f:
+                report = evaluate_prefilter(detector, prefilter, f, args.batch_size)
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+
+        elif args.backfill:
+            total = run_backfill(detector, args.backfill, args.output,
+                                 workers=args.workers, batch_size=args.batch_size)
+            print(json.dumps({'status': 'complete', 'lines': total, 'output': args.output}))
+
+        elif args.stream:
+            # Fail at startup rather than with one error line per input
+            detector.load()
+            stream_ndjson(detector, sys.stdin, sys.stdout,
+                          batch_size=args.batch_size, max_wait_ms=args.max_wait_ms)
+
+        elif args.serve:
+            # Load before announcing readiness so the first request doesn't pay for it
+            detector.load()
+            batcher = MicroBatcher(detector.batch_detect,
+                                   max_batch_size=args.max_batch_size,
+                                   max_wait_ms=args.max_wait_ms)
+            try:
+                if args.port:
+                    serve_tcp(detector, batcher, args.host, args.port)
+                else:
+                    # Enough concurrent requests in flight to fill two batches
+                    serve_stdio(detector, batcher, max_concurrency=2 * args.max_batch_size)
+            finally:
+                batcher.close()
+
+        elif args.batch:
             # Process batch input from stdin
             input_data = json.loads(sys.stdin.read())
             if isinstance(input_data, list):
@@ -128,19 +877,29 @@ def main():
             else:
                 results = [detector.detect_toxicity(input_data.get('text', ''))]
             
-            print(json.dumps(results, ensure_ascii=False, indent=2))
+            with detector.stage('json_encode'):
+                output = json.dumps(results, ensure_ascii=False, indent=2)
+            print(output)
             
-        elif args.text:
+        elif args.text is not None:
             # Process single text
             result = detector.detect_toxicity(args.text)
-            print(json.dumps(result, ensure_ascii=False, indent=2))
+            with detector.stage('json_encode'):
+                output = json.dumps(result, ensure_ascii=False, indent=2)
+            print(output)
             
         else:
             # Interactive mode - read from stdin
             input_data = json.loads(sys.stdin.read())
             text = input_data.get('text', '') if isinstance(input_data, dict) else str(input_data)
             result = detector.detect_toxicity(text)
-            print(json.dumps(result, ensure_ascii=False))
+            with detector.stage('json_encode'):
+                output = json.dumps(result, ensure_ascii=False)
+            print(output)
+
+        if args.stats and not args.serve:
+            # stdout carries the results, so the timing report goes to stderr
+            print(json.dumps(detector.stats(), ensure_ascii=False, indent=2), file=sys.stderr)
             
     except Exception as e:
         error_result = {
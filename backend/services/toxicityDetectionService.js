@@ -1,11 +1,21 @@
 const { spawn } = require('child_process');
 const path = require('path');
 
+// Spawning the detector and loading the model; a load that takes longer is killed
+const DAEMON_START_TIMEOUT_MS = 120000;
+
 class ToxicityDetectionService {
     constructor() {
         this.pythonPath = 'python'; // Adjust if needed
         this.scriptPath = path.join(__dirname, 'toxicity-detector.py');
         this.isInitialized = false;
+
+        // Long-lived detector process (see startDaemon)
+        this.daemon = null;
+        this.daemonReady = null;
+        this.daemonLoaded = false;
+        this.pendingRequests = new Map();
+        this.requestCounter = 0;
     }
 
     /**
@@ -32,127 +42,182 @@ class ToxicityDetectionService {
     }
 
     /**
-     * Detect toxicity in text using Detoxify model
-     * @param {string} text - Text to analyze
-     * @returns {Promise<Object>} Toxicity analysis result
+     * Start (or reuse) the long-lived detector process.
+     * The model is loaded once and requests are exchanged as NDJSON lines.
+     * @returns {Promise<ChildProcess>} Ready daemon process
      */
-    async detectToxicity(text) {
-        return new Promise((resolve, reject) => {
-            if (!text || text.trim().length === 0) {
-                resolve({
-                    toxicity: 0.0,
-                    severe_toxicity: 0.0,
-                    obscene: 0.0,
-                    threat: 0.0,
-                    insult: 0.0,
-                    identity_attack: 0.0,
-                    is_toxic: false,
-                    max_score: 0.0,
-                    toxic_type: 'none',
-                    confidence: 0.0
-                });
-                return;
-            }
+    startDaemon() {
+        if (this.daemonReady) {
+            return this.daemonReady;
+        }
 
-            const pythonProcess = spawn(this.pythonPath, [this.scriptPath], {
+        this.daemonReady = new Promise((resolve, reject) => {
+            const daemon = spawn(this.pythonPath, [this.scriptPath, '--serve'], {
                 stdio: ['pipe', 'pipe', 'pipe']
             });
 
-            let stdout = '';
-            let stderr = '';
+            let buffer = '';
+            let ready = false;
+            let exited = false;
 
-            pythonProcess.stdout.on('data', (data) => {
-                stdout += data.toString();
-            });
+            const startTimer = setTimeout(() => {
+                onExit(`Detector process not ready after ${DAEMON_START_TIMEOUT_MS} ms`);
+                daemon.kill();
+            }, DAEMON_START_TIMEOUT_MS);
 
-            pythonProcess.stderr.on('data', (data) => {
-                stderr += data.toString();
-            });
+            daemon.stdout.on('data', (data) => {
+                buffer += data.toString();
+                let newlineIndex;
+                while ((newlineIndex = buffer.indexOf('\n')) >= 0) {
+                    const line = buffer.slice(0, newlineIndex).trim();
+                    buffer = buffer.slice(newlineIndex + 1);
+                    if (!line) continue;
 
-            pythonProcess.on('close', (code) => {
-                if (code === 0) {
+                    let message;
                     try {
-                        const result = JSON.parse(stdout);
-                        resolve(result);
+                        message = JSON.parse(line);
                     } catch (error) {
-                        resolve({ error: `Failed to parse result: ${error.message}`, is_toxic: false, confidence: 0.0 });
+                        continue;
+                    }
+
+                    if (!ready && message.status === 'ready') {
+                        ready = true;
+                        this.daemonLoaded = true;
+                        clearTimeout(startTimer);
+                        resolve(daemon);
+                        continue;
+                    }
+
+                    const pending = this.pendingRequests.get(message.id);
+                    if (pending) {
+                        this.pendingRequests.delete(message.id);
+                        clearTimeout(pending.timer);
+                        pending.resolve(message);
                     }
-                } else {
-                    resolve({ error: `Detection failed with code ${code}`, is_toxic: false, confidence: 0.0 });
                 }
             });
 
-            pythonProcess.on('error', (error) => {
-                resolve({ error: `Failed to spawn process: ${error.message}`, is_toxic: false, confidence: 0.0 });
-            });
+            // Model loading logs go to stderr; drain it so the pipe never blocks
+            daemon.stderr.on('data', () => {});
 
-            // Send input data
-            const inputData = JSON.stringify({ text: text });
-            pythonProcess.stdin.write(inputData);
-            pythonProcess.stdin.end();
+            const onExit = (reason) => {
+                // Runs once per process, and never resets a daemon started after this one
+                if (exited) return;
+                exited = true;
+                clearTimeout(startTimer);
+                if (this.daemon === daemon) {
+                    this.daemon = null;
+                    this.daemonReady = null;
+                    this.daemonLoaded = false;
+                }
+                for (const [id, pending] of this.pendingRequests) {
+                    clearTimeout(pending.timer);
+                    pending.resolve({ id, error: reason });
+                }
+                this.pendingRequests.clear();
+                if (!ready) reject(new Error(reason));
+            };
 
-            // Set timeout
-            setTimeout(() => {
-                pythonProcess.kill();
-                resolve({ error: 'Detection timeout', is_toxic: false, confidence: 0.0 });
-            }, 15000); // 15 seconds timeout
+            daemon.on('close', (code) => onExit(`Detector process exited with code ${code}`));
+            daemon.on('error', (error) => onExit(`Failed to spawn process: ${error.message}`));
+            // Writing to a process that died between requests fails with EPIPE; without
+            // a handler that 'error' event would crash the backend
+            daemon.stdin.on('error', (error) => {
+                onExit(`Detector process input closed: ${error.message}`);
+                daemon.kill();
+            });
+
+            this.daemon = daemon;
         });
+
+        return this.daemonReady;
     }
 
     /**
-     * Batch toxicity detection for multiple texts
-     * @param {Array<string>} texts - Array of texts to analyze
-     * @returns {Promise<Array<Object>>} Array of toxicity results
+     * Send one request to the daemon and wait for its matching response
+     * @param {Object} payload - Request body ({ text } or { texts })
+     * @param {number} timeoutMs - Per-request timeout, starting the daemon included
+     * @returns {Promise<Object>} Daemon response
      */
-    async detectToxicityBatch(texts) {
-        return new Promise((resolve, reject) => {
-            if (!texts || texts.length === 0) {
-                resolve([]);
-                return;
-            }
+    sendRequest(payload, timeoutMs) {
+        const id = ++this.requestCounter;
 
-            const pythonProcess = spawn(this.pythonPath, [this.scriptPath, '--batch'], {
-                stdio: ['pipe', 'pipe', 'pipe']
-            });
-
-            let stdout = '';
-            let stderr = '';
+        return new Promise((resolve) => {
+            const timer = setTimeout(() => {
+                this.pendingRequests.delete(id);
+                resolve({ id, error: 'Detection timeout' });
+            }, timeoutMs);
 
-            pythonProcess.stdout.on('data', (data) => {
-                stdout += data.toString();
-            });
+            // Registered before the daemon is up, so a failed start answers it too
+            this.pendingRequests.set(id, { resolve, timer });
+            this.startDaemon().then((daemon) => {
+                if (this.pendingRequests.has(id)) {
+                    daemon.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+                }
+            }, () => {});
+        });
+    }
 
-            pythonProcess.stderr.on('data', (data) => {
-                stderr += data.toString();
-            });
+    /**
+     * Stop the daemon process
+     */
+    shutdown() {
+        if (this.daemon) {
+            this.daemon.stdin.write(JSON.stringify({ command: 'shutdown' }) + '\n');
+            this.daemon.stdin.end();
+        }
+    }
 
-            pythonProcess.on('close', (code) => {
-                if (code === 0) {
-                    try {
-                        const results = JSON.parse(stdout);
-                        resolve(results);
-                    } catch (error) {
-                        reject(new Error(`Failed to parse batch toxicity results: ${error.message}`));
-                    }
-                } else {
-                    reject(new Error(`Batch toxicity detection failed with code ${code}: ${stderr}`));
-                }
-            });
+    /**
+     * Detect toxicity in text using Detoxify model
+     * @param {string} text - Text to analyze
+     * @returns {Promise<Object>} Toxicity analysis result
+     */
+    async detectToxicity(text) {
+        if (!text || text.trim().length === 0) {
+            return {
+                toxicity: 0.0,
+                severe_toxicity: 0.0,
+                obscene: 0.0,
+                threat: 0.0,
+                insult: 0.0,
+                identity_attack: 0.0,
+                is_toxic: false,
+                max_score: 0.0,
+                toxic_type: 'none',
+                confidence: 0.0
+            };
+        }
 
-            pythonProcess.on('error', (error) => {
-                reject(new Error(`Failed to spawn batch toxicity process: ${error.message}`));
-            });
+        try {
+            // The first call also pays for model loading
+            const timeoutMs = this.daemonLoaded ? 15000 : DAEMON_START_TIMEOUT_MS;
+            const response = await this.sendRequest({ text: text }, timeoutMs);
+            if (response.error) {
+                return { error: response.error, is_toxic: false, confidence: 0.0 };
+            }
+            return response.result;
+        } catch (error) {
+            return { error: error.message, is_toxic: false, confidence: 0.0 };
+        }
+    }
 
-            // Send input data
-            pythonProcess.stdin.write(JSON.stringify(texts));
-            pythonProcess.stdin.end();
+    /**
+     * Batch toxicity detection for multiple texts
+     * @param {Array<string>} texts - Array of texts to analyze
+     * @returns {Promise<Array<Object>>} Array of toxicity results
+     */
+    async detectToxicityBatch(texts) {
+        if (!texts || texts.length === 0) {
+            return [];
+        }
 
-            // Set timeout
-            setTimeout(() => {
-                pythonProcess.kill();
-                reject(new Error('Batch toxicity detection timeout'));
-            }, 30000); // 30 seconds timeout
-        });
+        const timeoutMs = this.daemonLoaded ? 30000 : DAEMON_START_TIMEOUT_MS;
+        const response = await this.sendRequest({ texts: texts }, timeoutMs);
+        if (response.error) {
+            throw new Error(`Batch toxicity detection failed: ${response.error}`);
+        }
+        return response.results;
     }
 
     /**
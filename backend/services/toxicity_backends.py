@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Inference backends for the toxicity detector
+- torch:     stock Detoxify (PyTorch fp32)
+- quantized: Detoxify with dynamic int8 quantization of the Linear layers
+- onnx:      Detoxify model exported once to ONNX and run with ONNX Runtime
+- stub:      deterministic fake scores, no weights needed (benchmarks the
+             non-model overhead in CI). Test-only: the scores look real, so
+             it is only offered when TOXICITY_STUB_BACKEND=1
+
+Every backend returns a Detoxify-compatible object: predict(str) gives
+{category: score}, predict([str]) gives {category: [score per text]}.
+
+Usage:
+    python toxicity_backends.py export --model original
+    python toxicity_backends.py parity --model original --backend onnx
+    python toxicity_backends.py benchmark --model original
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import zlib
+import tempfile
+import subprocess
+from importlib import metadata
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ['torch', 'quantized', 'onnx']
+STUB_BACKEND = 'stub'
+STUB_BACKEND_ENV = 'TOXICITY_STUB_BACKEND'
+STUB_CLASS_NAMES = ['toxicity', 'severe_toxicity', 'obscene', 'threat', 'insult', 'identity_attack']
+DEFAULT_ONNX_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'onnx')
+ONNX_OPSET = 14
+
+# Fixed corpus for parity checks and benchmarks (English + Vietnamese, clean and toxic)
+PARITY_CORPUS = [
+    "Great tour, thanks!",
+    "The hotel was clean and the staff were very friendly.",
+    "Our guide was late and the bus was dirty, very disappointed.",
+    "You are an idiot and your company is a scam.",
+    "Shut up, nobody cares about your stupid opinion.",
+    "I will find you and make you regret this.",
+    "Tour Đà Nẵng - Hội An rất tuyệt vời, hướng dẫn viên nhiệt tình.",
+    "Khách sạn bẩn, nhân viên thái độ kém, không bao giờ quay lại.",
+    "Đồ ngu, lừa đảo khách hàng!",
+    "Click here to win free money!!! bit.ly/win-now",
+    "ok",
+    "The food in Hanoi was amazing, especially the pho and bun cha. " * 8,
+]
+
+
+def available_backends():
+    """BACKENDS, plus the stub backend when STUB_BACKEND_ENV is set (tests and CI benchmarks)"""
+    return BACKENDS + [STUB_BACKEND] if os.environ.get(STUB_BACKEND_ENV) == '1' else list(BACKENDS)
+
+
+def default_onnx_dir(model_name):
+    return os.path.join(DEFAULT_ONNX_ROOT, model_name)
+
+
+def _package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return 'none'
+
+
+def warm_start_path(warm_dir, model_name, backend):
+    """
+    Snapshot file for a fully constructed model. The name includes the detoxify
+    and torch versions, so upgrading either one starts a fresh snapshot.
+    """
+    versions = f"detoxify{_package_version('detoxify')}-torch{_package_version('torch')}"
+    return os.path.join(warm_dir, f"{model_name}-{backend}-{versions}.pt")
+
+
+def _load_torch_model(model_name, backend):
+    from detoxify import Detoxify
+
+    model = Detoxify(model_name)
+    if backend == 'quantized':
+        import torch
+        model.model = torch.quantization.quantize_dynamic(
+            model.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return model
+
+
+def _load_warm(model_name, backend, warm_dir):
+    """
+    Load the torch/quantized model from a pickled snapshot, creating it on the
+    first run. Skips checkpoint resolution, config/tokenizer construction,
+    random init and re-quantization on every later start.
+
+    The snapshot is the whole pickled model (hundreds of MB) and loading it
+    runs arbitrary code, so warm_dir must be a private directory outside the
+    source tree.
+    """
+    import torch
+
+    path = warm_start_path(warm_dir, model_name, backend)
+    if os.path.exists(path):
+        try:
+            try:
+                return torch.load(path, map_location='cpu', weights_only=False)
+            except TypeError:  # torch < 1.13 has no weights_only argument
+                return torch.load(path, map_location='cpu')
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable warm-start snapshot {path}: {e}")
+
+    model = _load_torch_model(model_name, backend)
+    try:
+        os.makedirs(warm_dir, exist_ok=True)
+        # A unique temp file per writer: the daemon and backfill workers may start at once
+        fd, tmp_path = tempfile.mkstemp(dir=warm_dir, prefix=os.path.basename(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                torch.save(model, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.info(f"Saved warm-start snapshot to {path}")
+    except Exception as e:
+        logger.warning(f"Could not save warm-start snapshot: {e}")
+    return model
+
+
+def load_model(model_name='original', backend='torch', onnx_dir=None, warm_dir=None):
+    """
+    Load a Detoxify-compatible model for the given backend.
+    warm_dir: directory for warm-start snapshots of torch/quantized models (None, the default, disables)
+    """
+    if backend in ('torch', 'quantized'):
+        if warm_dir:
+            return _load_warm(model_name, backend, warm_dir)
+        return _load_torch_model(model_name, backend)
+
+    if backend == 'onnx':
+        return OnnxDetoxify(onnx_dir or default_onnx_dir(model_name))
+
+    if backend == STUB_BACKEND and STUB_BACKEND in available_backends():
+        return StubDetoxify()
+
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+class OnnxDetoxify:
+    def __init__(self, onnx_dir):
+        """Load an exported model directory (see export_onnx)"""
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        meta_path = os.path.join(onnx_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(
+                f"No exported ONNX model in {onnx_dir}; run: python toxicity_backends.py export"
+            )
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.class_names = meta['class_names']
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(onnx_dir, 'model.onnx'), providers=['CPUExecutionProvider']
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def predict(self, text):
+        texts = [text] if isinstance(text, str) else list(text)
+        inputs = self.tokenizer(texts, return_tensors='np', truncation=True, padding=True)
+        feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+        logits = self.session.run(None, feed)[0]
+        scores = 1.0 / (1.0 + np.exp(-logits))
+        scores = scores.astype(np.float32)
+
+        results = {}
+        for i, name in enumerate(self.class_names):
+            if isinstance(text, str):
+                results[name] = scores[0][i]
+            else:
+                results[name] = [scores[row][i].tolist() for row in range(len(scores))]
+        return results
+
+
+class _WhitespaceTokenizer:
+    """Tokenizer stand-in for the stub backend: one token per word"""
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, tokens):
+        return ' '.join(tokens)
+
+
+class StubDetoxify:
+    """Deterministic low scores derived from a hash of the text; no model weights"""
+
+    def __init__(self):
+        self.class_names = list(STUB_CLASS_NAMES)
+        self.tokenizer = _WhitespaceTokenizer()
+
+    def predict(self, text):
+        texts = [text] if isinstance(text, str) else list(text)
+        seeds = np.array([zlib.crc32(t.encode('utf-8')) for t in texts], dtype=np.uint64)
+        columns = np.arange(1, len(self.class_names) + 1, dtype=np.uint64)
+        # Cheap per-(text, category) hash mapped to [0, 0.2)
+        scores = ((seeds[:, None] * columns * np.uint64(2654435761)) % np.uint64(1000)).astype(np.float32) / 5000
+
+        results = {}
+        for i, name in enumerate(self.class_names):
+            if isinstance(text, str):
+                results[name] = scores[0][i]
+            else:
+                results[name] = [scores[row][i].tolist() for row in range(len(scores))]
+        return results
+
+
+def export_onnx(model_name, onnx_dir=None):
+    """One-time conversion of a Detoxify checkpoint to ONNX"""
+    import torch
+    from detoxify import Detoxify
+
+    onnx_dir = onnx_dir or default_onnx_dir(model_name)
+    os.makedirs(onnx_dir, exist_ok=True)
+
+    detoxify = Detoxify(model_name)
+    detoxify.model.eval()
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    sample = detoxify.tokenizer(PARITY_CORPUS[:2], return_tensors='pt', truncation=True, padding=True)
+    torch.onnx.export(
+        LogitsOnly(detoxify.model),
+        (sample['input_ids'], sample['attention_mask']),
+        os.path.join(onnx_dir, 'model.onnx'),
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'}
+        },
+        opset_version=ONNX_OPSET
+    )
+
+    detoxify.tokenizer.save_pretrained(onnx_dir)
+    with open(os.path.join(onnx_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_name': model_name,
+            'class_names': list(detoxify.class_names),
+            'opset': ONNX_OPSET
+        }, f, indent=2)
+
+    logger.info(f"Exported {model_name} to {onnx_dir}")
+    return onnx_dir
+
+
+def _score_matrix(model, texts):
+    scores = model.predict(texts)
+    class_names = list(scores.keys())
+    return class_names, np.array([scores[name] for name in class_names], dtype=np.float64).T
+
+
+def parity_check(model_name, backend, onnx_dir=None, threshold=0.3):
+    """Maximum score drift of a backend against the PyTorch path on PARITY_CORPUS"""
+    reference_names, reference = _score_matrix(load_model(model_name, 'torch'), PARITY_CORPUS)
+    names, candidate = _score_matrix(load_model(model_name, backend, onnx_dir), PARITY_CORPUS)
+
+    if names != reference_names:
+        raise ValueError(f"Category mismatch: {names} != {reference_names}")
+
+    drift = np.abs(candidate - reference)
+    flips = (reference.max(axis=1) > threshold) != (candidate.max(axis=1) > threshold)
+
+    return {
+        'model': model_name,
+        'backend': backend,
+        'texts': len(PARITY_CORPUS),
+        'max_drift': float(drift.max()),
+        'mean_drift': float(drift.mean()),
+        'max_drift_by_category': dict(zip(names, drift.max(axis=0).tolist())),
+        'is_toxic_flips': int(flips.sum())
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _benchmark_one(model_name, backend, onnx_dir, batch_size, repeats):
+    started = time.perf_counter()
+    model = load_model(model_name, backend, onnx_dir)
+    load_seconds = time.perf_counter() - started
+
+    texts = (PARITY_CORPUS * ((batch_size // len(PARITY_CORPUS)) + 1))[:batch_size]
+    model.predict(texts)  # warm-up
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(texts)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'texts_per_second': batch_size * repeats / elapsed,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def benchmark(model_name, backends, onnx_dir=None, batch_size=32, repeats=5):
+    """
+    Throughput and peak memory per backend. Each backend runs in a fresh
+    interpreter so resident memory is not shared between measurements.
+    """
+    results = []
+    for backend in backends:
+        command = [sys.executable, os.path.abspath(__file__), '_benchmark_one',
+                   '--model', model_name, '--backend', backend,
+                   '--batch-size', str(batch_size), '--repeats', str(repeats)]
+        if onnx_dir:
+            command += ['--onnx-dir', onnx_dir]
+
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            error_lines = completed.stderr.strip().splitlines() or ['unknown error']
+            results.append({'backend': backend, 'error': error_lines[-1]})
+        else:
+            results.append(json.loads(completed.stdout))
+    return results
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Toxicity detector inference backends')
+    parser.add_argument('command', choices=['export', 'parity', 'benchmark', '_benchmark_one'])
+    parser.add_argument('--model', type=str, default='original',
+                       choices=['original', 'unbiased', 'multilingual'])
+    parser.add_argument('--backend', type=str, default='onnx', choices=available_backends(),
+                       help='Backend to check or benchmark (default: onnx)')
+    parser.add_argument('--onnx-dir', type=str,
+                       help=f'Exported model directory (default: {DEFAULT_ONNX_ROOT}/<model>)')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        result = {'onnx_dir': export_onnx(args.model, args.onnx_dir)}
+    elif args.command == 'parity':
+        result = parity_check(args.model, args.backend, args.onnx_dir)
+    elif args.command == 'benchmark':
+        result = benchmark(args.model, available_backends(), args.onnx_dir, args.batch_size, args.repeats)
+    else:
+        result = _benchmark_one(args.model, args.backend, args.onnx_dir, args.batch_size, args.repeats)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Parallel, resumable toxicity backfill over a large NDJSON file
+Used when the threshold or model changes and every historical review has to be re-scored.
+
+The input is split into N contiguous byte ranges (one shard per worker process).
+The model is loaded once in the parent and workers are forked afterwards, so the
+weights are shared copy-on-write instead of being loaded N times. Each shard appends
+results to its own part file and checkpoints the input offset after every batch;
+an interrupted run picks up from the last checkpoint.
+
+Input lines:  {"id": ..., "text": "..."}  or  "plain text"
+Output lines: {"id": ..., "result": {...}}  (in input order once merged)
+"""
+
+import os
+import json
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+# Set in the parent before forking; inherited by every worker
+_DETECTOR = None
+
+
+def parse_input_line(line, line_number):
+    """Return (id, text) for one NDJSON input line"""
+    item = json.loads(line)
+    if isinstance(item, dict):
+        return item.get('id', line_number), item.get('text', '')
+    return line_number, item if isinstance(item, str) else str(item)
+
+
+def plan_shards(input_path, workers):
+    """Split the file into byte ranges that start and end on line boundaries"""
+    size = os.path.getsize(input_path)
+    boundaries = [0]
+    with open(input_path, 'rb') as f:
+        for i in range(1, workers):
+            f.seek(max(size * i // workers, boundaries[-1]))
+            if f.tell() > 0:
+                f.readline()  # move to the start of the next line
+            boundaries.append(min(f.tell(), size))
+    boundaries.append(size)
+    return [(boundaries[i], boundaries[i + 1]) for i in range(workers)]
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _count_lines(path, end):
+    """Number of newlines in the first `end` bytes of a file"""
+    count = 0
+    remaining = end
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(min(1 << 20, remaining))
+            if not chunk:
+                break
+            count += chunk.count(b'\n')
+            remaining -= len(chunk)
+    return count
+
+
+def _shard_paths(work_dir, shard):
+    return (os.path.join(work_dir, f'shard-{shard:03d}.ndjson'),
+            os.path.join(work_dir, f'shard-{shard:03d}.checkpoint.json'))
+
+
+def _process_shard(task):
+    shard, start, end, input_path, work_dir, batch_size, torch_threads = task
+    part_path, checkpoint_path = _shard_paths(work_dir, shard)
+
+    if torch_threads:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+
+    checkpoint = {'offset': start, 'line_number': None, 'output_bytes': 0, 'done': 0}
+    if os.path.exists(checkpoint_path):
+        checkpoint = _read_json(checkpoint_path)
+        if checkpoint['offset'] >= end:
+            return shard, checkpoint['done']
+
+    # Drop anything written after the last checkpoint
+    with open(part_path, 'ab') as out:
+        out.truncate(checkpoint['output_bytes'])
+
+    line_number = checkpoint['line_number']
+    if line_number is None:
+        # Line numbers are global so default ids don't depend on the shard layout
+        line_number = _count_lines(input_path, start)
+
+    with open(input_path, 'rb') as f, open(part_path, 'ab') as out:
+        f.seek(checkpoint['offset'])
+        done = checkpoint['done']
+
+        while f.tell() < end:
+            entries = []  # (id, text) to score, or a ready-made error line, in input order
+            while f.tell() < end and len(entries) < batch_size:
+                raw = f.readline()
+                line_number += 1
+                if not raw.strip():
+                    continue
+                try:
+                    entries.append(parse_input_line(raw.decode('utf-8'), line_number))
+                except ValueError as e:
+                    entries.append({'id': line_number, 'error': f"Invalid JSON: {e}"})
+
+            texts = [entry[1] for entry in entries if isinstance(entry, tuple)]
+            results = iter(_DETECTOR.batch_detect(texts) if texts else [])
+            lines = [entry if isinstance(entry, dict) else {'id': entry[0], 'result': next(results)}
+                     for entry in entries]
+            out.write(''.join(json.dumps(line, ensure_ascii=False) + '\n' for line in lines).encode('utf-8'))
+            out.flush()
+            os.fsync(out.fileno())
+
+            done += len(lines)
+            _write_json_atomic(checkpoint_path, {
+                'offset': f.tell(),
+                'line_number': line_number,
+                'output_bytes': out.tell(),
+                'done': done
+            })
+
+    return shard, done
+
+
+def run_backfill(detector, input_path, output_path, workers=None, batch_size=64):
+    """
+    Score every line of input_path into output_path with `workers` processes.
+    Progress lives in <output_path>.parts/ and is resumed on the next run with
+    the same input and worker count. Returns the number of lines written.
+    """
+    global _DETECTOR
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        logger.warning("fork is not available on this platform; running the backfill in one process")
+        workers = 1
+
+    work_dir = output_path + '.parts'
+    os.makedirs(work_dir, exist_ok=True)
+
+    plan = {
+        'input': os.path.abspath(input_path),
+        'input_size': os.path.getsize(input_path),
+        'workers': workers,
+        'shards': plan_shards(input_path, workers)
+    }
+    plan_path = os.path.join(work_dir, 'plan.json')
+    if os.path.exists(plan_path):
+        previous = _read_json(plan_path)
+        previous['shards'] = [tuple(shard) for shard in previous['shards']]
+        if previous != plan:
+            raise ValueError(f"{work_dir} belongs to a different run; delete it to start over")
+        logger.info(f"Resuming backfill from checkpoints in {work_dir}")
+    else:
+        _write_json_atomic(plan_path, plan)
+
+    # Split the cores between workers instead of every worker using all of them
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    tasks = [(shard, start, end, input_path, work_dir, batch_size, torch_threads)
+             for shard, (start, end) in enumerate(plan['shards'])]
+
+    # Load before forking so every worker shares the same weights
+    detector.load()
+    _DETECTOR = detector
+    if workers == 1:
+        results = [_process_shard(task) for task in tasks]
+    else:
+        # fork keeps the already-loaded weights shared copy-on-write
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers) as pool:
+            results = []
+            for shard, done in pool.imap_unordered(_process_shard, tasks):
+                logger.info(f"Shard {shard} finished: {done} lines")
+                results.append((shard, done))
+
+    with open(output_path, 'wb') as out:
+        for shard in range(workers):
+            part_path, _ = _shard_paths(work_dir, shard)
+            with open(part_path, 'rb') as part:
+                while True:
+                    chunk = part.read(1 << 20)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+
+    total = sum(done for _, done in results)
+    logger.info(f"Backfill complete: {total} lines written to {output_path}")
+    return total
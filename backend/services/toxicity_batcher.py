@@ -0,0 +1,125 @@
+"""
+Dynamic micro-batching for the toxicity detector daemon
+Collects concurrent requests into one batch so the model runs one forward pass
+for many callers instead of one per text
+"""
+
+import time
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, score_fn, max_batch_size=32, max_wait_ms=10):
+        """
+        score_fn: callable taking a list of texts and returning one result per text
+        max_batch_size: flush as soon as this many texts are queued
+        max_wait_ms: flush at most this long after the oldest queued text arrived
+        """
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = deque()  # (text, future, enqueued_at)
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # Statistics
+        self._batches = 0
+        self._items = 0
+        self._flush_reasons = Counter()
+        self._batch_sizes = Counter()
+        self._total_wait = 0.0
+        self._max_queue_depth = 0
+
+        self._worker = threading.Thread(target=self._run, name='toxicity-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """Queue one text and return a Future resolving to its result"""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Batcher is closed')
+            self._queue.append((text, future, time.monotonic()))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._condition.notify()
+        return future
+
+    def submit_many(self, texts):
+        """Queue several texts, returning one Future per text"""
+        return [self.submit(text) for text in texts]
+
+    def close(self):
+        """Stop accepting texts, score everything still queued, then stop the worker"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+
+    def stats(self):
+        """Queue depth and batch-size statistics for latency/throughput tuning"""
+        with self._condition:
+            return {
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self._max_queue_depth,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': self._items / self._batches if self._batches else 0.0,
+                'avg_queue_wait_ms': self._total_wait * 1000.0 / self._items if self._items else 0.0,
+                'flush_reasons': dict(self._flush_reasons),
+                'batch_size_histogram': {str(size): count for size, count in sorted(self._batch_sizes.items())}
+            }
+
+    def _next_batch(self):
+        """Block until a batch is due; returns (batch, reason) or (None, None) when closed and drained"""
+        with self._condition:
+            while not self._queue:
+                if self._closed:
+                    return None, None
+                self._condition.wait()
+
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            if len(self._queue) >= self.max_batch_size:
+                reason = 'full'
+            elif self._closed:
+                reason = 'close'
+            else:
+                reason = 'timeout'
+
+            size = min(len(self._queue), self.max_batch_size)
+            batch = [self._queue.popleft() for _ in range(size)]
+            return batch, reason
+
+    def _run(self):
+        while True:
+            batch, reason = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.monotonic()
+            texts = [text for text, _, _ in batch]
+            try:
+                results = self.score_fn(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+
+            with self._condition:
+                self._batches += 1
+                self._items += len(batch)
+                self._flush_reasons[reason] += 1
+                self._batch_sizes[len(batch)] += 1
+                self._total_wait += sum(started - enqueued_at for _, _, enqueued_at in batch)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Throughput/latency benchmark for toxicity-detector.py
+Measures, per model variant:
+- model load time (and detector module import time)
+- single-text latency (p50/p99) through detect_toxicity
+- batch throughput for several batch sizes and text lengths through batch_detect
+- peak RSS
+
+--startup instead times whole CLI invocations: --help, empty text, an argument
+error, and scoring one text with a cold versus warm-start model load.
+
+Each variant runs in a fresh interpreter so load time and memory are not shared.
+--stub swaps in the stub backend (no weights), which measures the non-model
+overhead and runs in CI; it sets TOXICITY_STUB_BACKEND=1 for the processes
+it starts, since the stub is not offered otherwise.
+
+Usage:
+    python toxicity_benchmark.py --models original multilingual --output bench.json
+    python toxicity_benchmark.py --stub --output bench-stub.json
+    python toxicity_benchmark.py --startup --models original
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+from datetime import datetime
+
+import numpy as np
+
+from toxicity_backends import PARITY_CORPUS, STUB_BACKEND, STUB_BACKEND_ENV, available_backends, peak_rss_mb
+
+DETECTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'toxicity-detector.py')
+DEFAULT_BATCH_SIZES = [1, 8, 32, 64]
+DEFAULT_TEXT_LENGTHS = [50, 300, 1500]
+
+
+def load_detector_module():
+    """Import toxicity-detector.py (the hyphen keeps it out of a plain import)"""
+    spec = importlib.util.spec_from_file_location('toxicity_detector', DETECTOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_texts(count, length, seed=0):
+    """Distinct texts of roughly `length` characters built from the parity corpus"""
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.extend(rng.choice(PARITY_CORPUS).split())
+        # Prefix keeps every text unique
+        texts.append(f"{i} " + ' '.join(words)[:length])
+    return texts
+
+
+def run_variant(model_name, backend, batch_sizes, text_lengths, latency_samples, repeats):
+    """Benchmark one model variant inside the current process"""
+    started = time.perf_counter()
+    module = load_detector_module()
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    detector = module.ToxicityDetector(model_name, backend=backend).load()
+    load_seconds = time.perf_counter() - started
+
+    # Single-text latency on short review-sized texts
+    texts = make_texts(latency_samples + 1, 120, seed=1)
+    detector.detect_toxicity(texts[-1])  # warm-up
+    latencies = []
+    for text in texts[:latency_samples]:
+        started = time.perf_counter()
+        detector.detect_toxicity(text)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+
+    throughput = []
+    for length in text_lengths:
+        for batch_size in batch_sizes:
+            texts = make_texts(batch_size * repeats, length, seed=length + batch_size)
+            detector.batch_detect(texts[:batch_size], batch_size=batch_size)  # warm-up
+            started = time.perf_counter()
+            detector.batch_detect(texts, batch_size=batch_size)
+            elapsed = time.perf_counter() - started
+            throughput.append({
+                'text_length': length,
+                'batch_size': batch_size,
+                'texts': len(texts),
+                'texts_per_second': len(texts) / elapsed,
+                'ms_per_batch': elapsed * 1000.0 / repeats
+            })
+
+    return {
+        'model': model_name,
+        'backend': backend,
+        'import_seconds': import_seconds,
+        'load_seconds': load_seconds,
+        'latency_ms': {
+            'samples': latency_samples,
+            'p50': float(np.percentile(latencies, 50)),
+            'p99': float(np.percentile(latencies, 99)),
+            'mean': float(np.mean(latencies))
+        },
+        'throughput': throughput,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def _time_command(arguments, runs):
+    """Median wall time in ms of running toxicity-detector.py with these arguments"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, DETECTOR_PATH, *arguments],
+                       stdin=subprocess.DEVNULL, capture_output=True)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return float(np.median(timings))
+
+
+def run_startup(models, backend, runs):
+    """Startup cost of CLI invocations, including cold versus warm model load"""
+    results = []
+    for model_name in models:
+        common = ['--model', model_name, '--backend', backend]
+        with tempfile.TemporaryDirectory() as warm_dir:
+            warm = [*common, '--model-cache-dir', warm_dir]
+            subprocess.run([sys.executable, DETECTOR_PATH, *warm, '--text', 'prime'],
+                           capture_output=True)  # writes the warm-start snapshot
+            results.append({
+                'model': model_name,
+                'backend': backend,
+                'help_ms': _time_command(['--help'], runs),
+                'empty_text_ms': _time_command([*common, '--text', ''], runs),
+                'argument_error_ms': _time_command(['--model', 'no-such-model'], runs),
+                'cold_score_ms': _time_command([*common, '--no-model-cache', '--text', 'hello'], runs),
+                'warm_score_ms': _time_command([*warm, '--text', 'hello'], runs)
+            })
+    return results
+
+
+def run_suite(models, backend, batch_sizes, text_lengths, latency_samples, repeats):
+    results = []
+    for model_name in models:
+        command = [sys.executable, os.path.abspath(__file__), '--run-one',
+                   '--models', model_name, '--backend', backend,
+                   '--batch-sizes', *map(str, batch_sizes),
+                   '--text-lengths', *map(str, text_lengths),
+                   '--latency-samples', str(latency_samples),
+                   '--repeats', str(repeats)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            error_lines = completed.stderr.strip().splitlines() or ['unknown error']
+            results.append({'model': model_name, 'backend': backend, 'error': error_lines[-1]})
+        else:
+            results.append(json.loads(completed.stdout))
+
+    return results
+
+
+def environment():
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Toxicity detector benchmark')
+    parser.add_argument('--models', nargs='+', default=['original'],
+                       choices=['original', 'unbiased', 'multilingual'])
+    parser.add_argument('--backend', type=str, default='torch', choices=available_backends())
+    parser.add_argument('--stub', action='store_true',
+                       help='Use the stub backend (no model weights) to measure non-model overhead')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--text-lengths', type=int, nargs='+', default=DEFAULT_TEXT_LENGTHS)
+    parser.add_argument('--latency-samples', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=4,
+                       help='Batches per (batch size, text length) throughput cell')
+    parser.add_argument('--startup', action='store_true',
+                       help='Time CLI startup paths, including cold versus warm model load')
+    parser.add_argument('--startup-runs', type=int, default=3)
+    parser.add_argument('--output', type=str, help='Write the JSON report to this file')
+    parser.add_argument('--run-one', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    backend = args.backend
+    if args.stub:
+        # Inherited by the variant and CLI processes started below
+        os.environ[STUB_BACKEND_ENV] = '1'
+        backend = STUB_BACKEND
+
+    if args.run_one:
+        report = run_variant(args.models[0], backend, args.batch_sizes, args.text_lengths,
+                             args.latency_samples, args.repeats)
+    elif args.startup:
+        report = {
+            'environment': environment(),
+            'config': {'backend': backend, 'startup_runs': args.startup_runs},
+            'startup': run_startup(args.models, backend, args.startup_runs)
+        }
+    else:
+        report = {
+            'environment': environment(),
+            'config': {
+                'backend': backend,
+                'batch_sizes': args.batch_sizes,
+                'text_lengths': args.text_lengths,
+                'latency_samples': args.latency_samples,
+                'repeats': args.repeats
+            },
+            'results': run_suite(args.models, backend, args.batch_sizes, args.text_lengths,
+                                 args.latency_samples, args.repeats)
+        }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Content-addressed result cache for toxicity scores
+Repeated texts (spam waves) are answered from memory or a local SQLite file
+instead of running the model again
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Canonical form used for cache keys: NFC unicode, collapsed whitespace"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def cache_key(model_name, text):
+    """sha256 of the model variant plus the normalized text"""
+    payload = f"{model_name}\0{normalize_text(text)}".encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+class ToxicityCache:
+    def __init__(self, max_entries=10000, db_path=None):
+        """
+        max_entries: size of the in-memory LRU tier
+        db_path: optional SQLite file for a persistent tier that survives restarts
+        """
+        self.max_entries = max_entries
+        self.db_path = db_path
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS toxicity_cache ('
+                'key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._db.commit()
+
+    def get(self, model_name, text):
+        """Return a copy of the cached result, or None on a miss"""
+        key = cache_key(model_name, text)
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(result)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT result FROM toxicity_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.disk_hits += 1
+                    return dict(result)
+
+            self.misses += 1
+            return None
+
+    def put(self, model_name, text, result):
+        """Store a successful result in both tiers"""
+        self.put_many(model_name, [(text, result)])
+
+    def put_many(self, model_name, items):
+        """Store several (text, result) pairs with a single SQLite commit"""
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, result in items:
+                if 'error' in result:
+                    continue
+                key = cache_key(model_name, text)
+                self._remember(key, dict(result))
+                rows.append((key, json.dumps(result, ensure_ascii=False), now))
+
+            if self._db is not None and rows:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO toxicity_cache (key, result, created_at) VALUES (?, ?, ?)',
+                    rows
+                )
+                self._db.commit()
+
+    def stats(self):
+        """Hit/miss counters for both tiers"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'persistent': self._db is not None,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': hits / lookups if lookups else 0.0
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,155 @@
+"""
+Cheap lexical first stage for the toxicity detector
+Settles obvious cases with a lexicon and a few regexes so only the rest reaches
+the model: explicit profanity is toxic, and a text is clean only when it is
+trivially short and made of greetings and thanks ("thanks!", "xin chào", "👍").
+A lexicon can't see threats or insults phrased in ordinary words ("I will hurt
+you badly", "thang lua dao"), so everything else goes to the model.
+Covers English and Vietnamese, with and without diacritics.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+# Explicit profanity: decided toxic without running the model. Each pattern
+# must match a whole word, so endings are listed instead of \w*, which would
+# also match "shiitake"
+_FUCK_ENDINGS = r'(?:s|ed|er|ers|in|ing|face|head|wit)?'
+PROFANITY = [
+    # English
+    r'f+u+c+k+' + _FUCK_ENDINGS, r'f[\*@#]+c?k' + _FUCK_ENDINGS, r'mother\s*f+u+c+k+' + _FUCK_ENDINGS,
+    r's+h+i+t+(?:s|ty|ted|ting|head|heads|hole|holes)?', r'sh[\*!1]+t',
+    r'b+i+t+c+h+(?:es|y|ing)?', r'a+s+s+h+o+l+e+s?', r'c+u+n+t+s?', r'bastards?', r'wtf', r'stfu',
+    # Vietnamese
+    r'đ+m+', r'đ+c+m+', r'c+m+m+', r'c+l+m+', r'v+c+l+', r'v+k+l+', r'v+l+',
+    r'dcm', r'dmm', r'đ+é+o+', r'đồ\s*chó', r'do\s*cho', r'mẹ\s*kiếp', r'me\s*kiep',
+    r'địt', r'đĩ', r'lồn', r'buồi', r'cặc', r'óc\s*chó', r'khốn\s*nạn', r'đồ\s*khốn',
+]
+
+# Insult/threat/identity vocabulary: not conclusive alone, always sent to the model
+SENSITIVE = [
+    # English
+    r'idiots?', r'stupid', r'dumb', r'morons?', r'losers?', r'hate', r'kill\w*', r'die', r'dead',
+    r'damn', r'crap', r'scam\w*', r'dick\w*', r'suck\w*', r'ugly', r'trash', r'shut\s*up',
+    r'racist', r'nigg\w*', r'fag\w*', r'retard\w*',
+    # Vietnamese
+    r'ngu', r'ngu\s*ngốc', r'đần', r'khùng', r'điên', r'cút', r'chết', r'giết', r'lừa\s*đảo',
+    r'rác', r'thất\s*học', r'mất\s*dạy', r'vô\s*học', r'chó', r'súc\s*vật', r'đồ\s*ngu', r'cc',
+]
+
+# Words a text may consist of to be decided clean without the model
+CLEAN_WORDS = frozenset("""
+    hi hello hey thanks thank you thx ty ok okay yes yeah yep no good great nice cool awesome
+    excellent perfect wonderful amazing beautiful helpful love it bye goodbye morning evening
+    night wow very so much
+    xin chào chao cảm cám ơn cam on tuyệt vời tuyet voi tốt tot đẹp dep hay dạ da vâng vang
+    rất rat quá qua nhé nhe ạ a hài lòng hai long thích thich
+""".split())
+
+DEFAULT_MAX_CLEAN_CHARS = 40
+
+_WORD = re.compile(r'\w+')
+_SHOUTING_MIN_LETTERS = 8
+_SHOUTING_RATIO = 0.7
+_REPEATED_PUNCTUATION = re.compile(r'[!?]{3,}')
+_MASKED_WORD = re.compile(r'\w[\*#@$%]+\w')
+
+
+def _compile(patterns):
+    return re.compile(r'(?<!\w)(?:' + '|'.join(patterns) + r')(?!\w)', re.IGNORECASE)
+
+
+class LexicalPrefilter:
+    def __init__(self, max_clean_chars=DEFAULT_MAX_CLEAN_CHARS):
+        """
+        max_clean_chars: longer texts always go to the model, since toxicity
+        can hide in context the lexicon cannot see
+        """
+        self.max_clean_chars = max_clean_chars
+        self._profanity = _compile(PROFANITY)
+        self._sensitive = _compile(SENSITIVE)
+
+    def classify(self, text):
+        """
+        Return (decision, reason): decision is 'toxic', 'clean', or None when
+        the text is ambiguous and needs the model
+        """
+        normalized = unicodedata.normalize('NFC', text).lower()
+
+        match = self._profanity.search(normalized)
+        if match:
+            return 'toxic', f"profanity:{match.group(0)}"
+
+        match = self._sensitive.search(normalized)
+        if match:
+            return None, f"sensitive:{match.group(0)}"
+
+        if len(text) > self.max_clean_chars:
+            return None, 'long_text'
+
+        letters = [c for c in text if c.isalpha()]
+        if len(letters) >= _SHOUTING_MIN_LETTERS and \
+                sum(c.isupper() for c in letters) / len(letters) > _SHOUTING_RATIO:
+            return None, 'shouting'
+
+        if _REPEATED_PUNCTUATION.search(text):
+            return None, 'repeated_punctuation'
+
+        if _MASKED_WORD.search(text):
+            return None, 'masked_word'
+
+        if any(word not in CLEAN_WORDS and not word.isdigit() for word in _WORD.findall(normalized)):
+            return None, 'not_allowlisted'
+
+        return 'clean', 'short_allowlisted'
+
+
+class PrefilterEvaluation:
+    """Compare prefilter decisions with model-only scoring, one text at a time"""
+
+    def __init__(self, max_examples=20):
+        self.max_examples = max_examples
+        self.total = 0
+        self.decisions = Counter()  # prefilter decision -> count
+        self.agreements = Counter()  # prefilter decision -> count agreeing with the model
+        self.reasons = Counter()
+        self.disagreements = []
+
+    def add(self, text, decision, reason, model_result):
+        self.total += 1
+        self.decisions[decision or 'model'] += 1
+        self.reasons[reason] += 1
+
+        if decision is None or 'error' in model_result:
+            return
+
+        model_toxic = bool(model_result.get('is_toxic'))
+        if (decision == 'toxic') == model_toxic:
+            self.agreements[decision] += 1
+        elif len(self.disagreements) < self.max_examples:
+            self.disagreements.append({
+                'text': text[:200],
+                'prefilter': decision,
+                'reason': reason,
+                'model_is_toxic': model_toxic,
+                'model_max_score': model_result.get('max_score')
+            })
+
+    def report(self):
+        decided = self.decisions['clean'] + self.decisions['toxic']
+        agreed = self.agreements['clean'] + self.agreements['toxic']
+        return {
+            'texts': self.total,
+            'decided_by_prefilter': decided,
+            'sent_to_model': self.decisions['model'],
+            'model_work_skipped': decided / self.total if self.total else 0.0,
+            'agreement': agreed / decided if decided else 0.0,
+            'agreement_by_decision': {
+                decision: self.agreements[decision] / self.decisions[decision]
+                for decision in ('clean', 'toxic') if self.decisions[decision]
+            },
+            'decisions': dict(self.decisions),
+            'reasons': dict(self.reasons.most_common(20)),
+            'disagreement_examples': self.disagreements
+        }
@@ -0,0 +1,70 @@
+"""
+Cheap language detection and model routing for the toxicity detector
+Vietnamese goes to the multilingual Detoxify model, English to the smaller
+'original' model, so neither language pays for the other's model.
+"""
+
+import re
+import unicodedata
+
+LANGUAGES = ['en', 'vi', 'other']
+DEFAULT_ROUTES = {'en': 'original', 'vi': 'multilingual', 'other': 'multilingual'}
+
+# Letters that only Vietnamese uses (French/Spanish share à, é, ô, ...)
+_VIETNAMESE_LETTERS = set(
+    'ăđơư'
+    'ạảặẳẵắằậẩẫấầẹẻẽệểễếềỉịĩọỏộổỗốồợởỡớờụủũựửữứừỳỷỹỵ'
+)
+# Frequent Vietnamese words typed without diacritics
+_VIETNAMESE_WORDS = {
+    'khong', 'duoc', 'nhung', 'cua', 'rat', 'nay', 'lam', 'nhieu', 'nguoi', 'toi',
+    'voi', 'chuyen', 'khach', 'phong', 'cam', 'dep', 'tot', 'qua', 'minh', 'thi',
+    'nhe', 'roi', 'cung', 'biet', 'gia', 'nhan', 'vien', 'huong', 'dan',
+}
+_WORD = re.compile(r'\w+')
+
+
+def detect_language(text):
+    """Return 'vi', 'en' or 'other' for a text"""
+    normalized = unicodedata.normalize('NFC', text).lower()
+
+    letters = [c for c in normalized if c.isalpha()]
+    if not letters:
+        return 'en'
+
+    if any(c in _VIETNAMESE_LETTERS for c in letters):
+        return 'vi'
+
+    non_latin = sum(1 for c in letters if 'LATIN' not in unicodedata.name(c, ''))
+    if non_latin / len(letters) > 0.5:
+        return 'other'
+
+    words = _WORD.findall(normalized)
+    hits = sum(1 for word in words if word in _VIETNAMESE_WORDS)
+    if hits >= 2 and hits / len(words) >= 0.2:
+        return 'vi'
+
+    return 'en'
+
+
+def parse_routes(spec):
+    """Parse 'en=original,vi=multilingual,...' over DEFAULT_ROUTES"""
+    routes = dict(DEFAULT_ROUTES)
+    for part in filter(None, (p.strip() for p in (spec or '').split(','))):
+        language, _, model_name = part.partition('=')
+        if language not in LANGUAGES or not model_name:
+            raise ValueError(f"Invalid route: {part} (expected <{'|'.join(LANGUAGES)}>=<model>)")
+        routes[language] = model_name
+    return routes
+
+
+class LanguageRouter:
+    def __init__(self, routes=None):
+        """routes: language -> Detoxify model name"""
+        self.routes = dict(routes or DEFAULT_ROUTES)
+
+    def route(self, text):
+        """Model name that should score this text"""
+        if not isinstance(text, str):
+            return self.routes['en']
+        return self.routes[detect_language(text)]
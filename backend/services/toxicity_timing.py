@@ -0,0 +1,104 @@
+"""
+Optional stage-level timing for the toxicity detector
+Records how long each stage of scoring takes (lookups, tokenization, forward
+pass, NumPy-to-Python conversion, JSON encoding) as per-stage histograms.
+
+Detectors without a StageTimer time nothing: every stage is the same shared
+no-op context manager, so the disabled cost is one attribute check per stage.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import nullcontext
+
+# Upper bucket bounds in milliseconds; anything slower lands in the overflow bucket
+HISTOGRAM_BOUNDS_MS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+NO_TIMING = nullcontext()
+
+
+class _Stage:
+    """Context manager timing one run of a stage"""
+
+    __slots__ = ('timer', 'name', 'started')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class StageTimer:
+    """Thread-safe per-stage duration histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}  # name -> [count, total seconds, max seconds, bucket counts]
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        bucket = bisect.bisect_left(HISTOGRAM_BOUNDS_MS, seconds * 1000.0)
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry is None:
+                entry = self._stages[name] = [0, 0.0, 0.0, [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3][bucket] += 1
+
+    def snapshot(self):
+        """Per-stage count, total/mean/max ms and a histogram keyed by bucket bound"""
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        with self._lock:
+            return {
+                name: {
+                    'count': count,
+                    'total_ms': total * 1000.0,
+                    'mean_ms': total * 1000.0 / count,
+                    'max_ms': longest * 1000.0,
+                    'histogram': {label: n for label, n in zip(labels, buckets) if n}
+                }
+                for name, (count, total, longest, buckets) in sorted(self._stages.items())
+            }
+
+
+class TimedTokenizer:
+    """
+    Wraps a model's tokenizer so calls made inside predict() are timed as
+    'tokenize'. The time is also kept per thread, so the caller can subtract it
+    from predict() and report the remainder as the forward pass.
+    """
+
+    def __init__(self, tokenizer, timer):
+        self._tokenizer = tokenizer
+        self._timer = timer
+        self._local = threading.local()
+
+    def __call__(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._tokenizer(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._local.seconds = getattr(self._local, 'seconds', 0.0) + elapsed
+            self._timer.record('tokenize', elapsed)
+
+    def take_seconds(self):
+        """Tokenizer time on this thread since the last call"""
+        seconds = getattr(self._local, 'seconds', 0.0)
+        self._local.seconds = 0.0
+        return seconds
+
+    def __getattr__(self, name):
+        return getattr(self._tokenizer, name)
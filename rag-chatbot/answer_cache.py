@@ -0,0 +1,183 @@
+"""
+Answer cache: repeated questions skip the OpenAI round trip
+Answers are keyed on the normalized question plus a fingerprint of the context
+retrieved for it, so an answer is reused only while the knowledge base still
+yields the same context; an upsert that changes the context retires it.
+
+- Near-duplicates (optional, off by default): a question whose hashed
+  embedding has cosine similarity >= similarity with a cached question over
+  the same context is a hit too ("Tour cancellation policy" / "tour
+  cancellation policy?"). The embedding is lexical, so "refundable" and "not
+  refundable" or "2 adults" and "4 adults" score above 0.9; numbers and
+  negations must therefore match exactly as well.
+- Entries expire after ttl seconds; past max_entries the least recently used
+  one is evicted
+- Persisted to SQLite, so answers survive restarts and both front ends share
+  them. Lookups are served from memory; only stores write to the database.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from context_cache import normalize_query
+from knowledge_index import tokenize
+from vector_index import HashingEmbedder
+
+DEFAULT_CACHE_PATH = os.path.join('indexes', 'answer-cache.sqlite3')
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_SIMILARITY = 0  # exact questions only; e.g. 0.9 also matches near-duplicates
+EMBEDDING_DIMENSIONS = 256
+NEGATIONS = frozenset(['not', 'no', 'never', 'none', 'nothing', 'without', 'neither', 'nor',
+                       'không', 'chưa', 'chẳng', 'chả', 'đừng', 'khong', 'chua', 'chang'])
+
+_CONTRACTED_NOT = re.compile(r"n['’]t\b")
+
+Entry = namedtuple('Entry', ['question', 'fingerprint', 'answer', 'created', 'embedding', 'guard'])
+
+
+def context_fingerprint(context):
+    return hashlib.sha256(context.encode('utf-8')).hexdigest()
+
+
+def guard_tokens(question):
+    """The numbers and negations in a question, which a near-duplicate must share exactly"""
+    words = tokenize(_CONTRACTED_NOT.sub(' not', question))
+    return tuple(sorted(word for word in words if word in NEGATIONS or any(c.isdigit() for c in word)))
+
+
+class AnswerCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES,
+                 similarity=DEFAULT_SIMILARITY):
+        """path=None keeps the cache in memory only"""
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.embedder = HashingEmbedder(EMBEDDING_DIMENSIONS) if similarity else None
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> Entry, least recently used first
+        self._by_fingerprint = {}  # context fingerprint -> keys, for near-duplicate matching
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, question TEXT NOT NULL, '
+                         'fingerprint TEXT NOT NULL, answer TEXT NOT NULL, created REAL NOT NULL)')
+        self._db.execute('DELETE FROM answers WHERE created < ?', (time.time() - self.ttl,))
+        self._db.commit()
+
+        rows = self._db.execute('SELECT key, question, fingerprint, answer, created FROM answers '
+                                'ORDER BY created DESC LIMIT ?', (self.max_entries,)).fetchall()
+        for key, question, fingerprint, answer, created in reversed(rows):
+            self._insert(key, Entry(question, fingerprint, answer, created, self._embed(question),
+                                    guard_tokens(question)))
+
+    def _key(self, question, fingerprint):
+        return hashlib.sha256(f"{question}\0{fingerprint}".encode('utf-8')).hexdigest()
+
+    def _embed(self, question):
+        return self.embedder.embed([question])[0] if self.embedder else None
+
+    def _insert(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._by_fingerprint.setdefault(entry.fingerprint, set()).add(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        keys = self._by_fingerprint[entry.fingerprint]
+        keys.discard(key)
+        if not keys:
+            del self._by_fingerprint[entry.fingerprint]
+        return entry
+
+    def _live(self, key, now):
+        """The entry if present and not expired (expired ones are dropped)"""
+        entry = self._entries.get(key)
+        if entry is not None and now - entry.created > self.ttl:
+            self._remove(key)
+            return None
+        return entry
+
+    def get(self, question, fingerprint):
+        """The cached answer for this question over this context, or None"""
+        question = normalize_query(question)
+        key = self._key(question, fingerprint)
+        embedding = None
+        now = time.time()
+
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.answer
+            candidates = list(self._by_fingerprint.get(fingerprint, ()))
+
+        if self.embedder and candidates:
+            embedding = self._embed(question)
+            guard = guard_tokens(question)
+        with self._lock:
+            best_key, best_similarity = None, self.similarity
+            for candidate in candidates if embedding is not None else ():
+                entry = self._live(candidate, now)
+                if entry is not None and entry.guard == guard:
+                    similarity = float(np.dot(entry.embedding, embedding))
+                    if similarity >= best_similarity:
+                        best_key, best_similarity = candidate, similarity
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.near_hits += 1
+                return self._entries[best_key].answer
+            self.misses += 1
+            return None
+
+    def put(self, question, fingerprint, answer):
+        question = normalize_query(question)
+        key = self._key(question, fingerprint)
+        entry = Entry(question, fingerprint, answer, time.time(), self._embed(question), guard_tokens(question))
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._insert(key, entry)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(next(iter(self._entries)))
+                self._remove(evicted[-1])
+
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)',
+                                 (key, question, fingerprint, answer, entry.created))
+                self._db.executemany('DELETE FROM answers WHERE key = ?', [(key,) for key in evicted])
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'similarity': self.similarity or None,
+                'persisted': self._db is not None,
+                'hits': self.hits,
+                'near_duplicate_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -1,13 +1,27 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import glob
+import hmac
 import json
-import requests
 import time
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 
+from answer_cache import DEFAULT_CACHE_PATH as DEFAULT_ANSWER_CACHE_PATH, DEFAULT_SIMILARITY, \
+    DEFAULT_TTL_SECONDS, AnswerCache, context_fingerprint
+from context_cache import DEFAULT_MAX_ENTRIES, ContextCache, normalize_query
+from index_cache import DEFAULT_CACHE_PATH, corpus_hash, load_snapshot, save_snapshot
+from knowledge_index import CATEGORIES, RETRIEVAL_MODES
+from knowledge_store import Document, KnowledgeSnapshot
+from llm_client import DEFAULT_BASE_URL, DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_READ_TIMEOUT, \
+    LLMError, get_llm_client
+from passages import SEPARATOR
+from quick_questions import QUICK_QUESTIONS
+from token_budget import MODEL_CONTEXT_TOKENS, fit_parts, get_token_counter
+from vector_index import DEFAULT_INDEX_DIR, VectorIndex
+
 # Load environment variables
 load_dotenv()
 
@@ -16,20 +30,61 @@ CORS(app)  # Allow cross-origin requests
 
 # OpenAI API configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your_openai_api_key_here")
-OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
+# A local stand-in for the OpenAI API can be used by pointing this at it
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL)
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+
+# 'bm25' (ranked), 'keyword' (original substring-count scorer) or 'dense' (vector index)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "bm25")
+# Built offline with: python vector_index.py build
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", DEFAULT_INDEX_DIR)
+# Loaded indexes are reused from here while the knowledge base is unchanged
+INDEX_CACHE_PATH = os.getenv("INDEX_CACHE_PATH", DEFAULT_CACHE_PATH)
+# Packed contexts of recent queries, dropped whenever the knowledge base changes
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+# 1: search only the category shards the question's intent picks (fewer tokens, lower
+# coverage; see context_benchmark.py); 0, the default, searches the whole knowledge base
+INTENT_ROUTING = os.getenv("INTENT_ROUTING", "0") == "1"
+# Answers to repeated questions over the same context; shared with the Streamlit app
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", DEFAULT_ANSWER_CACHE_PATH)
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", DEFAULT_TTL_SECONDS))
+# Cosine similarity (e.g. 0.9) for a near-duplicate question to count as a hit; 0, the default, disables
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", DEFAULT_SIMILARITY))
+# Answer the quick questions in the background once the first request arrives (0 to skip)
+PREWARM_ANSWERS = os.getenv("PREWARM_ANSWERS", "1") == "1"
+# Sent as X-Admin-Token to the /admin endpoints; they are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+class AIServiceError(Exception):
+    """The OpenAI call failed; the message is the apology shown to the user"""
 
 class CMPTravelChatbotAPI:
-    def __init__(self):
+    def __init__(self, retrieval_mode=None):
         self.api_key = OPENAI_API_KEY
+        self.retrieval_mode = retrieval_mode or RETRIEVAL_MODE
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {self.retrieval_mode}")
         self.knowledge_base_path = "knowledge-base-travel"
-        self.all_content = []
-        self.category_content = {}
+        # Documents, passages and indexes; replaced as a whole on every load or update
+        self.knowledge = KnowledgeSnapshot()
+        self.update_lock = threading.Lock()  # one admin update at a time
+        self.startup = None  # how long load_all_content took and whether the index cache was used
+        self.context_cache = ContextCache(CONTEXT_CACHE_SIZE)
+        try:
+            self.answer_cache = AnswerCache(ANSWER_CACHE_PATH, ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY)
+        except Exception as e:
+            print(f"⚠️ Answer cache not persisted: {str(e)}")
+            self.answer_cache = AnswerCache(None, ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY)
+        self.model = "gpt-3.5-turbo"
+        self.token_counter = get_token_counter(self.model)
+        self.max_response_tokens = 600
+        self.max_context_tokens = 1200  # Conservative limit for web API
         
-        # OpenAI headers
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        # Pooled keep-alive connections to OpenAI, shared with every other instance
+        self.llm = get_llm_client(self.api_key, OPENAI_BASE_URL, OPENAI_CONNECT_TIMEOUT, OPENAI_READ_TIMEOUT,
+                                  OPENAI_MAX_RETRIES)
         
         self.system_prompt = """You are CMP Travel AI Assistant, a professional travel consultant.
 
@@ -52,11 +107,10 @@ CMP Travel Contact:
 Remember: You represent CMP Travel brand. Be professional and helpful!"""
 
         # Load knowledge base on startup
-        self.load_all_content()
-
-    def estimate_tokens(self, text):
-        """Rough token estimation (1 token ≈ 4 characters for English)"""
-        return len(text) // 4
+        total_loaded = self.load_all_content()
+        if self.startup:
+            print(f"✅ Loaded {total_loaded} documents in {self.startup['seconds'] * 1000:.0f} ms "
+                  f"(index cache {self.startup['index_cache']})")
 
     def load_all_content(self):
         """Load all content from knowledge base"""
@@ -64,155 +118,300 @@ Remember: You represent CMP Travel brand. Be professional and helpful!"""
             print(f"❌ Knowledge base not found at {self.knowledge_base_path}")
             return 0
 
+        started = time.perf_counter()
         categories = ['tours', 'hotels', 'blogs', 'guides', 'general']
-        total_loaded = 0
+
+        # Skip re-reading and re-indexing when no knowledge base file has changed
+        digest = corpus_hash(self.knowledge_base_path, categories)
+        knowledge = load_snapshot(INDEX_CACHE_PATH, digest)
+        if knowledge is not None:
+            self.open_vector_index(knowledge)
+            self.knowledge = knowledge
+            self.startup = {'seconds': time.perf_counter() - started, 'index_cache': 'hit'}
+            return len(knowledge.all_content)
+
+        documents = []
 
         for category in categories:
             category_path = f"{self.knowledge_base_path}/{category}"
             if os.path.exists(category_path):
                 files = glob.glob(f"{category_path}/*.txt")
-                category_content = []
                 
                 for file_path in files:
                     try:
                         with open(file_path, 'r', encoding='utf-8') as f:
                             content = f.read()
                             if content.strip():
-                                category_content.append(content)
-                                self.all_content.append(content)
-                                total_loaded += 1
+                                # The file name ("tour_<id>") is the id the admin endpoints use
+                                documents.append(Document(Path(file_path).stem, category, content))
                     except Exception as e:
                         print(f"⚠️ Cannot read file {file_path}: {str(e)}")
-                
-                self.category_content[category] = category_content
 
-        print(f"✅ Loaded {total_loaded} documents")
-        return total_loaded
+        # Retrieval works on section-aware passages rather than whole files
+        knowledge = KnowledgeSnapshot(documents, categories)
 
-    def get_relevant_context(self, query, max_results=3):
-        """Get relevant context from knowledge base with token limit"""
-        query_lower = query.lower()
-        relevant_content = []
-        
-        # Score content based on keyword matches
-        scored_content = []
-        for content in self.all_content:
-            content_lower = content.lower()
-            score = 0
-            
-            # Search for query terms
-            query_terms = query_lower.split()
-            for term in query_terms:
-                if term in content_lower:
-                    score += content_lower.count(term)
-            
-            if score > 0:
-                scored_content.append((score, content))
-        
-        # Sort by score and get top results
-        scored_content.sort(key=lambda x: x[0], reverse=True)
-        
-        # Limit context length to avoid token limit
-        total_chars = 0
-        max_chars = 6000  # Conservative limit for web API
-        
-        for _, content in scored_content[:max_results]:
-            if total_chars + len(content[:1200]) < max_chars:
-                relevant_content.append(content[:1200])  # Truncate individual content
-                total_chars += len(content[:1200])
-            else:
-                break
-        
-        return "\n\n---\n\n".join(relevant_content)
+        try:
+            save_snapshot(INDEX_CACHE_PATH, digest, knowledge)
+        except Exception as e:
+            print(f"⚠️ Cannot save index cache: {str(e)}")
 
-    def call_openai_api(self, user_message, context=""):
-        """Call OpenAI API with token management"""
-        
-        # Calculate token estimates
-        system_tokens = self.estimate_tokens(self.system_prompt)
-        user_tokens = self.estimate_tokens(user_message)
-        context_tokens = self.estimate_tokens(context)
-        
-        # Total input tokens (leave 600 for response)
-        max_input_tokens = 16385 - 600
-        current_tokens = system_tokens + user_tokens + context_tokens + 50
-        
-        # Truncate context if needed
-        if current_tokens > max_input_tokens:
-            available_for_context = max_input_tokens - system_tokens - user_tokens - 50
-            max_context_chars = available_for_context * 4
-            
-            if max_context_chars > 0:
-                context = context[:max_context_chars] + "..."
-            else:
-                context = "Limited context due to length constraints."
+        self.open_vector_index(knowledge)
+        self.knowledge = knowledge
+        self.startup = {'seconds': time.perf_counter() - started, 'index_cache': 'miss'}
+        return len(documents)
+
+    def open_vector_index(self, knowledge):
+        """Memory-mapped, so opening it costs nothing until a dense query touches it"""
+        if os.path.exists(VECTOR_INDEX_DIR):
+            try:
+                knowledge.attach_vectors(VectorIndex.open(VECTOR_INDEX_DIR,
+                                                          [passage.text for passage in knowledge.passages]))
+            except Exception as e:
+                print(f"⚠️ Vector index not used: {str(e)}")
+
+    def update_documents(self, upserts=(), deletes=()):
+        """
+        Apply document upserts/deletes and swap in the resulting snapshot; requests
+        already running keep the snapshot they started with
+        """
+        with self.update_lock:
+            return self._apply_updates(upserts, deletes)
+
+    def upsert_document(self, doc_id, content, category=None):
+        """
+        Add or replace one document; an existing document keeps its category
+        unless one is given. Reading it and swapping in the update happen under
+        one lock, so concurrent updates of the same document can't interleave.
+        Raises ValueError for an invalid category.
+        """
+        with self.update_lock:
+            existing = self.knowledge.documents.get(doc_id)
+            category = category or (existing.category if existing else None)
+            if category not in CATEGORIES:
+                raise ValueError(f"Invalid category (expected one of: {', '.join(CATEGORIES)})")
+            result = self._apply_updates([Document(doc_id, category, content)], ())
+        return {**result, 'created': existing is None}
+
+    def _apply_updates(self, upserts, deletes):
+        """Build and publish the next snapshot; the caller holds update_lock"""
+        started = time.perf_counter()
+        missing = [doc_id for doc_id in deletes if doc_id not in self.knowledge.documents]
+        if missing:
+            raise KeyError(', '.join(missing))
+        knowledge, added, removed = self.knowledge.updated(upserts, deletes)
+        self.knowledge = knowledge
+        return {
+            'version': knowledge.version,
+            'passages_added': added,
+            'passages_removed': removed,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def get_relevant_context(self, query, max_results=8, categories=None, max_tokens=None):
+        """
+        Get relevant context from knowledge base with token limit, plus which
+        category shards were searched (given categories, the query's intent with
+        INTENT_ROUTING, else the unsharded index)
+        and how long each took
+        """
+        knowledge = self.knowledge  # one snapshot for the whole request
         
+        # Whole passages packed by their token counts, cached at index time
+        max_tokens = self.max_context_tokens if max_tokens is None else min(max_tokens, self.max_context_tokens)
+
+        # Repeated questions reuse the context packed for this knowledge base version
+        key = (normalize_query(query), tuple(categories or ()), self.retrieval_mode, max_results, max_tokens)
+        cached = self.context_cache.get(key, knowledge.version)
+        if cached is not None:
+            context, retrieval = cached
+            return context, {**retrieval, 'context_cache': 'hit'}
+
+        context, retrieval = knowledge.context(query, max_results, max_tokens, self.retrieval_mode, categories,
+                                               routing=INTENT_ROUTING)
+        self.context_cache.put(key, knowledge.version, (context, retrieval))
+        return context, {**retrieval, 'context_cache': 'miss'}
+
+    def build_messages(self, user_message, context):
         full_prompt = f"""Context: {context}
 
 User: {user_message}
 
 Response:"""
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": full_prompt}
+        ]
 
-        payload = {
-            "model": "gpt-3.5-turbo",
-            "messages": [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": full_prompt}
-            ],
-            "max_tokens": 600,
+    def context_budget(self, user_message):
+        """Tokens left for context after the system prompt, the question and the reply"""
+        prompt_tokens = self.token_counter.count_messages(self.build_messages(user_message, ""))
+        return max(0, MODEL_CONTEXT_TOKENS[self.model] - self.max_response_tokens - prompt_tokens)
+
+    def build_payload(self, user_message, context="", context_tokens=None):
+        """Chat completion request body with token management"""
+        
+        # Drop whole passages from the end if the context doesn't fit (never cut mid-word)
+        budget = self.context_budget(user_message)
+        if context_tokens is None:
+            context_tokens = self.token_counter.count(context)
+        if context_tokens > budget:
+            context = fit_parts(context.split(SEPARATOR), SEPARATOR, budget, self.token_counter) \
+                or "Limited context due to length constraints."
+
+        return {
+            "model": self.model,
+            "messages": self.build_messages(user_message, context),
+            "max_tokens": self.max_response_tokens,
             "temperature": 0.7
         }
 
+    def service_error(self, error):
+        """The AIServiceError (apology for the user) for a failed OpenAI request"""
+        print(f"❌ {str(error)}")
+        if error.status is None:
+            return AIServiceError("Sorry, I'm unable to connect to the AI service right now. Please try again later.")
+        return AIServiceError(f"Sorry, I'm experiencing technical difficulties. Error: {error.status}")
+
+    def call_openai_api(self, user_message, context="", context_tokens=None):
+        """Call OpenAI API; raises AIServiceError when it fails"""
         try:
-            response = requests.post(
-                OPENAI_API_URL,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content']
-            else:
-                error_info = response.json() if response.content else {"error": "Unknown error"}
-                return f"Sorry, I'm experiencing technical difficulties. Error: {response.status_code}"
-                
-        except Exception as e:
-            return "Sorry, I'm unable to connect to the AI service right now. Please try again later."
+            return self.llm.complete(self.build_payload(user_message, context, context_tokens))
+        except LLMError as e:
+            raise self.service_error(e) from e
+
+    def stream_openai_api(self, user_message, context="", context_tokens=None):
+        """Call OpenAI API with stream=True, yielding the answer as it is generated; raises AIServiceError"""
+        try:
+            yield from self.llm.stream(self.build_payload(user_message, context, context_tokens))
+        except LLMError as e:
+            raise self.service_error(e) from e
 
-    def chat(self, user_input):
-        """Main chat function"""
-        if not self.all_content:
-            return "❌ Knowledge base not loaded. Please contact support."
+    def chat(self, user_input, categories=None):
+        """Main chat function; returns the response and the retrieval details"""
+        if not self.knowledge.all_content:
+            return "❌ Knowledge base not loaded. Please contact support.", None
         
-        # Get relevant context
-        context = self.get_relevant_context(user_input)
+        # Get relevant context, sized to what the prompt has room for
+        context, retrieval = self.get_relevant_context(user_input, categories=categories,
+                                                       max_tokens=self.context_budget(user_input))
         
-        # Call OpenAI API
-        response = self.call_openai_api(user_input, context)
-        return response
+        # The same question over the same context was answered before
+        fingerprint = context_fingerprint(context)
+        response = self.answer_cache.get(user_input, fingerprint)
+        if response is not None:
+            return response, {**retrieval, 'answer_cache': 'hit'}
+
+        # Call OpenAI API; only real answers are cached, never the apology for a failure
+        try:
+            response = self.call_openai_api(user_input, context, retrieval['context_tokens'])
+        except AIServiceError as e:
+            return str(e), {**retrieval, 'answer_cache': 'error'}
+        self.answer_cache.put(user_input, fingerprint, response)
+        return response, {**retrieval, 'answer_cache': 'miss'}
+
+    def chat_stream(self, user_input, categories=None):
+        """
+        Streaming chat: yields ('retrieval', details), then ('delta', text) for
+        each piece of the answer as it arrives, then ('done', timings) with the
+        time to the first piece and the total time, or ('error', message)
+        """
+        started = time.perf_counter()
+        if not self.knowledge.all_content:
+            yield 'error', "❌ Knowledge base not loaded. Please contact support."
+            return
+
+        answer, first_piece = [], None
+        try:
+            context, retrieval = self.get_relevant_context(user_input, categories=categories,
+                                                           max_tokens=self.context_budget(user_input))
+            fingerprint = context_fingerprint(context)
+            cached = self.answer_cache.get(user_input, fingerprint)
+            yield 'retrieval', {**retrieval, 'answer_cache': 'miss' if cached is None else 'hit'}
+
+            # A cached answer arrives as a single piece
+            pieces = [cached] if cached is not None else \
+                self.stream_openai_api(user_input, context, retrieval['context_tokens'])
+            for piece in pieces:
+                if first_piece is None:
+                    first_piece = time.perf_counter()
+                answer.append(piece)
+                yield 'delta', piece
+        except AIServiceError as e:
+            # Whatever was streamed before the failure is not cached
+            yield 'error', str(e)
+            return
+        except Exception as e:
+            # The response has already started, so the client only learns of the failure from this event
+            print(f"❌ Chat stream failed: {str(e)}")
+            yield 'error', str(e)
+            return
+
+        if cached is None:
+            self.answer_cache.put(user_input, fingerprint, ''.join(answer))
+        finished = time.perf_counter()
+        yield 'done', {
+            'ttft_ms': round(((first_piece or finished) - started) * 1000, 2),
+            'total_ms': round((finished - started) * 1000, 2),
+        }
+
+    def prewarm_answers(self, questions):
+        """Answer the questions not cached yet; stops at the first AI service error"""
+        answered = 0
+        for question in questions:
+            _, retrieval = self.chat(question)
+            if retrieval is None or retrieval['answer_cache'] == 'error':
+                break
+            answered += retrieval['answer_cache'] == 'miss'
+        return answered
 
 # Initialize chatbot
 chatbot = CMPTravelChatbotAPI()
+prewarm_started = threading.Event()
+
+@app.before_request
+def start_prewarm():
+    """
+    Pre-warm in the process that serves requests: with debug=True the reloader
+    also imports this module in a parent process that never serves any, so
+    starting at import time would pay for every quick question twice
+    """
+    if PREWARM_ANSWERS and not prewarm_started.is_set():
+        prewarm_started.set()
+        # Cached answers persist, so after the first start this only asks about expired ones
+        threading.Thread(target=chatbot.prewarm_answers, args=(QUICK_QUESTIONS,), daemon=True).start()
+
+def parse_chat_request(data):
+    """The message and categories of a chat request body, plus an error when it is invalid"""
+    if not data or 'message' not in data:
+        return None, None, 'Missing message field'
+    
+    user_message = data['message']
+    if not user_message.strip():
+        return None, None, 'Empty message'
+    
+    # Optional "category" (one name or a list) overrides the intent classifier
+    categories = data.get('category') or None
+    if isinstance(categories, str):
+        categories = [categories]
+    if categories is not None and (not isinstance(categories, list) or
+                                   any(category not in CATEGORIES for category in categories)):
+        return None, None, f"Invalid category (expected one of: {', '.join(CATEGORIES)})"
+    return user_message, categories, None
 
 @app.route('/chat', methods=['POST'])
 def chat_endpoint():
     """Chat API endpoint"""
     try:
-        data = request.get_json()
-        if not data or 'message' not in data:
-            return jsonify({'error': 'Missing message field'}), 400
-        
-        user_message = data['message']
-        if not user_message.strip():
-            return jsonify({'error': 'Empty message'}), 400
+        user_message, categories, error = parse_chat_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
         
         # Get chatbot response
-        response = chatbot.chat(user_message)
+        response, retrieval = chatbot.chat(user_message, categories)
         
         return jsonify({
             'response': response,
+            'retrieval': retrieval,
             'status': 'success'
         })
         
@@ -222,30 +421,110 @@ def chat_endpoint():
             'status': 'error'
         }), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream_endpoint():
+    """
+    Chat API endpoint streaming the answer as Server-Sent Events: a retrieval
+    event, delta events with pieces of the answer, then done (ttft_ms and
+    total_ms) or error
+    """
+    try:
+        user_message, categories, error = parse_chat_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+    def events():
+        for event, data in chatbot.chat_stream(user_message, categories):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def admin_authorized():
+    """True if ADMIN_TOKEN is set and the request carries it"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+@app.route('/admin/documents/<doc_id>', methods=['PUT'])
+def upsert_document(doc_id):
+    """Add or replace one document, e.g. after a tour price change; live immediately"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized', 'status': 'error'}), 403
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('content'), str) or not data['content'].strip():
+            return jsonify({'error': 'Missing content field'}), 400
+        
+        # An existing document keeps its category unless one is given
+        result = chatbot.upsert_document(doc_id, data['content'], data.get('category'))
+        return jsonify({**result, 'doc_id': doc_id, 'status': 'success'})
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/admin/documents/<doc_id>', methods=['DELETE'])
+def delete_document(doc_id):
+    """Remove one document; live immediately"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized', 'status': 'error'}), 403
+    try:
+        result = chatbot.update_documents(deletes=[doc_id])
+        return jsonify({**result, 'doc_id': doc_id, 'status': 'success'})
+    except KeyError:
+        return jsonify({'error': f"Unknown document: {doc_id}", 'status': 'error'}), 404
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    knowledge = chatbot.knowledge
     return jsonify({
         'status': 'healthy',
-        'knowledge_base_loaded': len(chatbot.all_content) > 0,
-        'total_documents': len(chatbot.all_content)
+        'knowledge_base_loaded': len(knowledge.all_content) > 0,
+        'total_documents': len(knowledge.all_content)
     })
 
 @app.route('/status', methods=['GET'])
 def status():
     """Get chatbot status"""
+    knowledge = chatbot.knowledge
     categories_info = {}
-    for cat, content_list in chatbot.category_content.items():
+    for cat, content_list in knowledge.category_content.items():
         categories_info[cat] = len(content_list)
     
     return jsonify({
         'status': 'online',
-        'total_documents': len(chatbot.all_content),
+        'total_documents': len(knowledge.all_content),
+        'total_passages': knowledge.passage_count,
         'categories': categories_info,
-        'api_model': 'gpt-3.5-turbo'
+        'shard_passages': {cat: len(shard.passage_ids) for cat, shard in knowledge.shards.items()},
+        'knowledge_version': knowledge.version,
+        'retrieval_mode': chatbot.retrieval_mode,
+        'intent_routing': INTENT_ROUTING,
+        'vector_index_loaded': knowledge.vectors is not None,
+        'startup': chatbot.startup,
+        'context_cache': chatbot.context_cache.stats(),
+        'answer_cache': chatbot.answer_cache.stats(),
+        'token_counter': chatbot.token_counter.method,
+        'llm_client': chatbot.llm.stats(),
+        'api_model': chatbot.model
     })
 
 if __name__ == '__main__':
     print("🚀 Starting CMP Travel Chatbot API...")
-    print(f"📊 Loaded {len(chatbot.all_content)} documents")
+    print(f"📊 Loaded {len(chatbot.knowledge.all_content)} documents")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
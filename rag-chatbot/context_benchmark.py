@@ -0,0 +1,142 @@
+"""
+Prompt context benchmark: tokens sent per query and how much of the query the
+context covers, for whole-document context (the original content[:1200] per
+document) versus packed passages (passages.py) in each retrieval mode, and
+what the chatbots send: passages packed into a token budget from the unsharded
+index (snapshot), or with INTENT_ROUTING from only the category shards picked
+by query_intent.py (snapshot+intent).
+
+Coverage is the share of a query's content words that appear in its context.
+Tokens are counted with token_budget.py: tiktoken's cl100k_base (the
+gpt-3.5-turbo encoding) when it is available, otherwise its estimate.
+
+Usage:
+    python context_benchmark.py
+    python context_benchmark.py --output context-bench.json
+"""
+
+import os
+import json
+import argparse
+import statistics
+
+from knowledge_index import BM25Index, InvertedIndex, load_documents, tokenize
+from knowledge_store import Document, KnowledgeSnapshot
+from passages import chunk_documents, pack_passages
+from token_budget import get_token_counter
+
+# The Streamlit quick questions plus the sample questions shown on its welcome screen
+QUERIES = [
+    "Top 5 hottest travel tours from CMP Travel",
+    "Best 5-star resorts in Vietnam with spa and casino",
+    "Best tour + hotel combo deals this month",
+    "CMP Travel contact information and office address",
+    "Family tours with children under 12, safe and fun",
+    "Northern Vietnam exploration tour: Hanoi - Sapa - Ha Long 5D4N",
+    "Most beautiful Phu Quoc resorts with private beach and VIP services",
+    "Free consultation for 7-day romantic honeymoon itinerary",
+    "Design private tours based on personal preferences",
+    "Fast visa services for Europe and Asia countries",
+    "What's special about Da Nang - Hoi An 4D3N tour?",
+    "Best 5-star beach view resorts in Nha Trang",
+    "Boutique hotels in Ho Chi Minh City under $100",
+    "How much is the Maldives tour and what does it include?",
+    "Which tour guide speaks French?",
+    "Tour cancellation policy",
+]
+
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'from', 'what', 'which', 'how', 'does', 'this', 'that',
+    'best', 'most', 'about', 'based', 'under', 'much', 'into', 'your', 'you', 'are', 'is',
+}
+
+DOCUMENT_MAX_RESULTS = 3
+DOCUMENT_CHARS = 1200
+MAX_CONTEXT_CHARS = 6000
+MAX_PASSAGES = 8
+MAX_CONTEXT_TOKENS = 1200  # chatbot_api.py's budget
+
+
+def coverage(query, context):
+    """Share of the query's content words found in the context"""
+    words = {word for word in tokenize(query) if len(word) > 2 and word not in STOPWORDS}
+    if not words:
+        return 1.0
+    context_words = set(tokenize(context))
+    return len(words & context_words) / len(words)
+
+
+def document_context(documents, index, query):
+    """The original context: top documents, each cut to its first 1200 characters"""
+    parts, total_chars = [], 0
+    for _, doc_id in index.search(query, DOCUMENT_MAX_RESULTS):
+        part = documents[doc_id][:DOCUMENT_CHARS]
+        if total_chars + len(part) >= MAX_CONTEXT_CHARS:
+            break
+        parts.append(part)
+        total_chars += len(part)
+    return "\n\n---\n\n".join(parts)
+
+
+def run(knowledge_base_path='knowledge-base-travel'):
+    counter = get_token_counter()
+    documents, paths = load_documents(knowledge_base_path)
+    passages = chunk_documents(documents)
+    passage_texts = [passage.text for passage in passages]
+
+    strategies = {
+        'documents/keyword': lambda q, index=InvertedIndex(documents): document_context(documents, index, q),
+        'documents/bm25': lambda q, index=BM25Index(documents): document_context(documents, index, q),
+    }
+    for mode, index in (('keyword', InvertedIndex(passage_texts)), ('bm25', BM25Index(passage_texts))):
+        strategies[f"passages/{mode}"] = lambda q, index=index: pack_passages(
+            passages, index.search(q, MAX_PASSAGES * 3), MAX_CONTEXT_CHARS, MAX_PASSAGES)
+    knowledge = KnowledgeSnapshot(Document(os.path.splitext(os.path.basename(path))[0],
+                                           os.path.basename(os.path.dirname(path)), document)
+                                  for document, path in zip(documents, paths))
+    strategies['snapshot/bm25'] = lambda q: knowledge.context(q, MAX_PASSAGES, MAX_CONTEXT_TOKENS)[0]
+    strategies['snapshot/bm25+intent'] = lambda q: knowledge.context(q, MAX_PASSAGES, MAX_CONTEXT_TOKENS,
+                                                                     routing=True)[0]
+
+    results = {}
+    for name, build_context in strategies.items():
+        tokens, covered = [], []
+        for query in QUERIES:
+            context = build_context(query)
+            tokens.append(counter.count(context))
+            covered.append(coverage(query, context))
+        results[name] = {
+            'mean_tokens': statistics.mean(tokens),
+            'max_tokens': max(tokens),
+            'mean_coverage': statistics.mean(covered),
+        }
+
+    return {
+        'token_method': counter.method,
+        'documents': len(documents),
+        'passages': len(passages),
+        'queries': len(QUERIES),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tokens sent per query by context strategy')
+    parser.add_argument('--knowledge-base', default='knowledge-base-travel')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    report = run(args.knowledge_base)
+    print(f"{report['documents']} documents, {report['passages']} passages, "
+          f"{report['queries']} queries; tokens: {report['token_method']}")
+    for name, result in report['results'].items():
+        print(f"  {name:20} {result['mean_tokens']:7.0f} tokens/query (max {result['max_tokens']}), "
+              f"coverage {result['mean_coverage']:.0%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
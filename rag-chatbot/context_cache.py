@@ -0,0 +1,70 @@
+"""
+Bounded LRU cache from a normalized query to its packed context
+Quick-question buttons and common customer questions repeat the same strings;
+a hit skips classification, the shard searches and packing.
+
+Entries belong to one knowledge base version (KnowledgeSnapshot.version). The
+first lookup or store under a newer version drops everything cached for older
+ones, so a reload or an admin upsert can never serve stale context.
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query):
+    """NFC, lowercase, single spaces: "  Tour  cancellation Policy" == "tour cancellation policy\""""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', query).lower()).strip()
+
+
+class ContextCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sync(self, version):
+        """False for a version older than the cache's (a request that started before an update)"""
+        if self.version is None or version > self.version:
+            self._entries.clear()
+            self.version = version
+        return version == self.version
+
+    def get(self, key, version):
+        with self._lock:
+            if self._sync(version) and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, version, value):
+        with self._lock:
+            if not self._sync(version):
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,61 @@
+"""
+On-disk cache of the chatbot's loaded knowledge base and retrieval indexes
+Saved after a full load together with a content hash of the knowledge base;
+a later start (or another "Initialize" click) with an unchanged knowledge base
+unpickles the KnowledgeSnapshot (knowledge_store.py) instead of re-chunking and
+re-indexing every file. Any change to a .txt file, or to SNAPSHOT_FORMAT, forces
+a rebuild, and so does a change of token counting method (token_budget.py).
+Live admin updates are not written back here.
+"""
+
+import os
+import glob
+import pickle
+import hashlib
+
+from token_budget import get_token_counter
+
+DEFAULT_CACHE_PATH = os.path.join('indexes', 'retrieval-cache.pkl')
+SNAPSHOT_FORMAT = 6  # bump when chunking or an index class changes shape
+
+
+def corpus_hash(knowledge_base_path, categories):
+    """sha256 over the relative path and bytes of every category .txt file"""
+    digest = hashlib.sha256()
+    for category in categories:
+        for file_path in sorted(glob.glob(f"{knowledge_base_path}/{category}/*.txt")):
+            digest.update(os.path.relpath(file_path, knowledge_base_path).encode('utf-8') + b'\0')
+            with open(file_path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def load_snapshot(cache_path, digest):
+    """The cached KnowledgeSnapshot, or None when there is none usable for this corpus"""
+    try:
+        with open(cache_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception:
+        # Missing, truncated or written by an incompatible version; it will be rebuilt
+        return None
+
+    if snapshot.get('format') != SNAPSHOT_FORMAT or snapshot.get('corpus_hash') != digest:
+        return None
+    # Cached passage token counts are only valid for the counter that made them
+    if snapshot['knowledge'].token_method != get_token_counter().method:
+        return None
+    return snapshot['knowledge']
+
+
+def save_snapshot(cache_path, digest, knowledge):
+    """Write the KnowledgeSnapshot atomically"""
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    snapshot = {
+        'format': SNAPSHOT_FORMAT,
+        'corpus_hash': digest,
+        'knowledge': knowledge,
+    }
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
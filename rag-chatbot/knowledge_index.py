@@ -0,0 +1,283 @@
+"""
+Retrieval indexes over the travel knowledge base
+Both are built once when the knowledge base is loaded, so a query only touches
+the postings of its own terms instead of lowercasing and scanning every document.
+
+InvertedIndex ('keyword' mode) matches the original keyword scorer exactly: a
+document scores the sum, over the whitespace-separated query terms, of
+content.lower().count(term). A term never contains whitespace, so each
+occurrence lies inside a single whitespace-separated token of the document;
+the postings are keyed by those tokens and a term is resolved to the tokens
+that contain it.
+
+BM25Index ('bm25' mode) ranks by Okapi BM25 over word tokens, so long documents
+and the all_*.txt aggregates no longer win on raw counts. Raw term
+frequencies and document lengths are stored in sparse matrices; a query weights
+only the entries of its own columns and scores them with one sparse
+matrix-vector product (a weighted bincount) plus an argpartition for the top-k.
+
+Both indexes can be extended without being modified: extended() returns a new
+index that shares every untouched posting / segment with the old one, appends
+documents and drops removed ids from results. A search running on the old index
+keeps seeing a consistent corpus while the new one is built (knowledge_store.py).
+
+Compare the two modes on the local knowledge base:
+    python knowledge_index.py "beach resort in Nha Trang" "tour Phú Quốc"
+"""
+
+import os
+import re
+import sys
+import glob
+import time
+import heapq
+import argparse
+import unicodedata
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+GRAM_SIZE = 3
+MAX_RESOLVED_TERMS = 4096
+RETRIEVAL_MODES = ['bm25', 'keyword', 'dense']  # dense: see vector_index.py
+CATEGORIES = ['tours', 'hotels', 'blogs', 'guides', 'general']
+_WORD = re.compile(r'\w+')
+
+
+def _grams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class InvertedIndex:
+    def __init__(self, documents=()):
+        self.postings = {}  # token -> {doc_id: occurrences of the token}
+        self.doc_count = 0
+        self.removed = frozenset()  # ids left out of results
+        self._token_grams = {}  # trigram -> set of tokens containing it
+        self._resolved = {}  # term -> [(token, occurrences of term in token)]
+        for document in documents:
+            self.add(document)
+
+    def add(self, document):
+        """Index one document and return its id (its position in load order)"""
+        doc_id = self.doc_count
+        self.doc_count += 1
+
+        for token, count in Counter(document.lower().split()).items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                for gram in _grams(token, GRAM_SIZE):
+                    self._token_grams.setdefault(gram, set()).add(token)
+            postings[doc_id] = count
+
+        self._resolved.clear()
+        return doc_id
+
+    def extended(self, documents=(), removed_ids=()):
+        """
+        A new index with documents appended (ids continue from doc_count) and
+        removed_ids excluded; postings and trigram sets are copied only where
+        they change, so this index is never modified
+        """
+        index = InvertedIndex()
+        index.postings = dict(self.postings)
+        index.doc_count = self.doc_count
+        index.removed = self.removed.union(removed_ids)
+        index._token_grams = dict(self._token_grams)
+
+        copied = set()
+        for document in documents:
+            doc_id = index.doc_count
+            index.doc_count += 1
+            for token, count in Counter(document.lower().split()).items():
+                if token not in index.postings:
+                    index.postings[token] = {}
+                    for gram in _grams(token, GRAM_SIZE):
+                        index._token_grams[gram] = index._token_grams.get(gram, frozenset()) | {token}
+                elif token not in copied:
+                    index.postings[token] = dict(index.postings[token])
+                copied.add(token)
+                index.postings[token][doc_id] = count
+        return index
+
+    def _resolve(self, term):
+        """Tokens containing the term, with how often the term occurs in each"""
+        matches = self._resolved.get(term)
+        if matches is not None:
+            return matches
+
+        if len(term) >= GRAM_SIZE:
+            # Candidate tokens contain every trigram of the term
+            gram_sets = sorted((self._token_grams.get(gram, set()) for gram in _grams(term, GRAM_SIZE)), key=len)
+            candidates = gram_sets[0].intersection(*gram_sets[1:])
+        else:
+            # Short terms ("to", "3d") can't use the trigram table
+            candidates = self.postings.keys()
+
+        matches = [(token, token.count(term)) for token in candidates if term in token]
+        if len(self._resolved) >= MAX_RESOLVED_TERMS:
+            self._resolved.clear()
+        self._resolved[term] = matches
+        return matches
+
+    def term_counts(self, term):
+        """{doc_id: content.lower().count(term)} for documents containing the term"""
+        counts = Counter()
+        for token, occurrences in self._resolve(term):
+            for doc_id, token_count in self.postings[token].items():
+                counts[doc_id] += token_count * occurrences
+        return counts
+
+    def search(self, query, max_results=3):
+        """
+        Top documents as [(score, doc_id)], best first; ties keep load order
+        like the stable sort in the original scorer
+        """
+        scores = Counter()
+        # A repeated query term counts once per repetition
+        for term, repeats in Counter(query.lower().split()).items():
+            for doc_id, count in self.term_counts(term).items():
+                scores[doc_id] += count * repeats
+        for doc_id in self.removed.intersection(scores):
+            del scores[doc_id]
+
+        top = heapq.nsmallest(max_results, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, doc_id) for doc_id, score in top]
+
+
+def tokenize(text):
+    """Lowercase word tokens; NFC first so composed and decomposed Vietnamese match"""
+    return _WORD.findall(unicodedata.normalize('NFC', text).lower())
+
+
+class BM25Index:
+    def __init__(self, documents=(), k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}  # term -> column
+        # (first doc id, CSC term frequencies); segments are shared by extended() indexes
+        self.segments = []
+        self.doc_lengths = np.empty(0, dtype=np.float32)
+        self.live = np.empty(0, dtype=bool)
+        self._append(documents)
+
+    def _refresh_statistics(self):
+        self.doc_count = int(self.live.sum())
+        self.avg_doc_length = float(self.doc_lengths[self.live].mean()) if self.doc_count else 0.0
+
+    def _append(self, documents):
+        """Add documents as one new segment (mutates; only called on an unpublished index)"""
+        first = len(self.doc_lengths)
+        rows, columns, frequencies, lengths = [], [], [], []
+
+        for row, document in enumerate(documents):
+            counts = Counter(tokenize(document))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                rows.append(row)
+                columns.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                frequencies.append(frequency)
+
+        if lengths:
+            matrix = sparse.csc_matrix((np.array(frequencies, dtype=np.float32), (rows, columns)),
+                                       shape=(len(lengths), len(self.vocabulary)), dtype=np.float32)
+            self.segments.append((first, matrix))
+        self.doc_lengths = np.concatenate([self.doc_lengths, np.array(lengths, dtype=np.float32)])
+        self.live = np.concatenate([self.live, np.ones(len(lengths), dtype=bool)])
+        self._refresh_statistics()
+
+    def extended(self, documents=(), removed_ids=()):
+        """A new index with documents appended as a segment and removed_ids excluded"""
+        index = BM25Index(k1=self.k1, b=self.b)
+        index.vocabulary = dict(self.vocabulary)
+        index.segments = list(self.segments)
+        index.doc_lengths = self.doc_lengths
+        index.live = self.live.copy()
+        index.live[list(removed_ids)] = False
+        index._append(documents)  # also refreshes the statistics after the removals
+        return index
+
+    def search(self, query, max_results=3):
+        """Top documents as [(score, doc_id)], best first; ties keep load order"""
+        counts = Counter(term for term in tokenize(query) if term in self.vocabulary)
+        if not counts or max_results <= 0:
+            return []
+
+        columns = np.array([self.vocabulary[term] for term in counts])
+        query_weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+        # Every (document, query term) entry across segments; a segment built
+        # before a term entered the vocabulary has no column for it
+        rows, terms, frequencies = [], [], []
+        for first, matrix in self.segments:
+            present = np.flatnonzero(columns < matrix.shape[1])
+            if not len(present):
+                continue
+            entries = matrix[:, columns[present]]
+            rows.append(entries.indices + first)
+            terms.append(np.repeat(present, np.diff(entries.indptr)))
+            frequencies.append(entries.data)
+        rows, terms, frequencies = (np.concatenate(parts) for parts in (rows, terms, frequencies))
+        keep = self.live[rows]
+        rows, terms, frequencies = rows[keep], terms[keep], frequencies[keep]
+
+        # Corpus statistics over live documents only, so removals don't skew idf
+        document_frequency = np.bincount(terms, minlength=len(columns))
+        idf = np.log1p((self.doc_count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[rows] / max(self.avg_doc_length, 1.0))
+        weights = idf[terms] * frequencies * (self.k1 + 1) / (frequencies + length_norm)
+
+        # The sparse (documents x query terms) weights times the query vector
+        scores = np.bincount(rows, weights * query_weights[terms], minlength=len(self.live))
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > max_results:
+            candidates = candidates[np.argpartition(-scores[candidates], max_results - 1)[:max_results]]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(float(scores[doc_id]), int(doc_id)) for doc_id in candidates[order]]
+
+
+def load_documents(knowledge_base_path='knowledge-base-travel'):
+    """Documents in the same order as the chatbots' load_all_content, with their paths"""
+    documents, paths = [], []
+    for category in CATEGORIES:
+        for file_path in glob.glob(f"{knowledge_base_path}/{category}/*.txt"):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            if content.strip():
+                documents.append(content)
+                paths.append(file_path)
+    return documents, paths
+
+
+def compare(queries, knowledge_base_path='knowledge-base-travel', max_results=3, repeats=20):
+    """Print latency and top-k per retrieval mode for each query"""
+    documents, paths = load_documents(knowledge_base_path)
+    indexes = {}
+    for mode, index_class in (('keyword', InvertedIndex), ('bm25', BM25Index)):
+        started = time.perf_counter()
+        indexes[mode] = index_class(documents)
+        print(f"{mode}: built over {len(documents)} documents in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    for query in queries:
+        print(f"\n{query}")
+        for mode, index in indexes.items():
+            started = time.perf_counter()
+            for _ in range(repeats):
+                ranked = index.search(query, max_results)
+            elapsed_ms = (time.perf_counter() - started) * 1000 / repeats
+            names = ', '.join(os.path.basename(paths[doc_id]) for _, doc_id in ranked) or '-'
+            print(f"  {mode:8} {elapsed_ms:7.3f} ms  {names}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare keyword and BM25 retrieval')
+    parser.add_argument('queries', nargs='+')
+    parser.add_argument('--knowledge-base', default='knowledge-base-travel')
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args()
+    if not os.path.exists(args.knowledge_base):
+        sys.exit(f"Knowledge base not found at {args.knowledge_base}")
+    compare(args.queries, args.knowledge_base, args.top_k)
@@ -0,0 +1,319 @@
+"""
+Versioned read snapshots of the travel knowledge base, with live updates
+A KnowledgeSnapshot holds the documents, their passages and every index over
+them, and is never modified once published. The chatbot keeps one reference to
+the current snapshot; a request reads that reference once and uses only that
+object, so it never sees a half-applied update.
+
+Every snapshot has one unsharded set of indexes over all passages, which is
+what a question searches by default, and one set per category shard (tours,
+hotels, blogs, guides, general) for questions restricted to categories.
+
+With routing on, a question that query_intent.py recognizes as a hotel
+question only searches the hotels shard. That sends fewer tokens, but covers
+less of the question: each shard ranks with its own statistics, and a
+question often names a category whose shard has little on its topic. On the
+context_benchmark.py queries routing covers 53% of the content words against
+60% unsharded, for 393 vs 418 tokens per query, so routing is opt-in. When
+the picked shards yield too few passages, the unsharded index is searched
+instead (widened).
+
+Upserting or deleting a document builds the next snapshot copy-on-write:
+- the document's old passages are tombstoned and its new ones appended, so
+  passage ids stay stable and only the affected shard's indexes are extended()
+- passages are indexed once per distinct text, but the same text often comes
+  from several files (a tour file and the all_tours.txt aggregate), so every
+  text keeps a count of the documents producing it and is only tombstoned
+  when no remaining document does
+- the same record inside the category's all_*.txt aggregate is patched too,
+  so the old text can't come back through the aggregate
+- once tombstones or BM25 segments pile up, the update does one full rebuild
+  instead (compaction) and passage ids are renumbered
+
+Every passage's token count is computed once, when it is indexed, so packing
+a context into a token budget only adds up cached counts (token_budget.py).
+
+Updates live in memory only. extract_mongodb_data.py stays the source of truth:
+the next full load of the knowledge base files replaces them.
+"""
+
+import copy
+import time
+import itertools
+from collections import namedtuple
+
+from knowledge_index import CATEGORIES, BM25Index, InvertedIndex
+from passages import SEPARATOR, chunk_document, select_passages
+from query_intent import classify_query
+from token_budget import get_token_counter
+from vector_index import VectorIndex
+
+Document = namedtuple('Document', ['doc_id', 'category', 'content'])
+
+MAX_SEGMENTS = 16  # BM25 segments in a shard or the unsharded index (one per update) before compacting
+MAX_REMOVED_SHARE = 0.25  # tombstoned share of passages before compacting
+
+# Snapshot versions increase across reloads too, so a version identifies one
+# snapshot for the life of the process (context_cache.py relies on this)
+_versions = itertools.count(1)
+
+
+class Shard:
+    """One category's passages and the indexes over them; index ids are positions in passage_ids"""
+
+    def __init__(self, category, passage_ids=(), texts=()):
+        self.category = category
+        self.passage_ids = list(passage_ids)  # shard id -> snapshot passage id
+        self.local_ids = {passage_id: local_id for local_id, passage_id in enumerate(self.passage_ids)}
+        self.index = InvertedIndex(texts)
+        self.bm25 = BM25Index(texts)
+        self.vectors = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['vectors'] = None
+        return state
+
+    def extended(self, passage_ids, texts, removed_ids):
+        """A new shard with passages appended; removed_ids from other shards are ignored"""
+        removed = [self.local_ids[passage_id] for passage_id in removed_ids if passage_id in self.local_ids]
+        if not passage_ids and not removed:
+            return self
+
+        shard = copy.copy(self)
+        shard.passage_ids = self.passage_ids + list(passage_ids)
+        shard.local_ids = dict(self.local_ids)
+        shard.local_ids.update((passage_id, len(self.passage_ids) + i) for i, passage_id in enumerate(passage_ids))
+        shard.index = self.index.extended(texts, removed)
+        shard.bm25 = self.bm25.extended(texts, removed)
+        if self.vectors is not None:
+            shard.vectors = self.vectors.extended(texts, removed)
+        return shard
+
+    def search(self, query, max_results, mode):
+        if mode == 'dense' and self.vectors is not None:
+            index = self.vectors
+        elif mode == 'keyword':
+            index = self.index
+        else:
+            # BM25 also stands in for dense retrieval until the vector index is built
+            index = self.bm25
+        return [(score, self.passage_ids[local_id]) for score, local_id in index.search(query, max_results)]
+
+
+class KnowledgeSnapshot:
+    def __init__(self, documents=(), categories=CATEGORIES):
+        """Full build: chunk every document and index every passage"""
+        self.version = next(_versions)
+        self.categories = list(categories)
+        # Category order keeps each shard's passages contiguous (see attach_vectors)
+        order = {category: position for position, category in enumerate(self.categories)}
+        documents = sorted(documents, key=lambda document: order.get(document.category, len(order)))
+        self.documents = {document.doc_id: document for document in documents}
+        self.passages, self.owners = [], {}  # passage text -> number of documents producing it
+        for doc_id, document in self.documents.items():
+            for passage in _distinct_passages(document.content, doc_id):
+                if passage.text not in self.owners:
+                    self.owners[passage.text] = 0
+                    self.passages.append(passage)
+                self.owners[passage.text] += 1
+        self.passage_ids = {passage.text: passage_id for passage_id, passage in enumerate(self.passages)}
+        self.removed = frozenset()  # tombstoned passage ids
+        counter = get_token_counter()
+        self.token_method = counter.method
+        self.passage_tokens = [counter.count(passage.text) for passage in self.passages]
+        self.vectors = None  # attached by the chatbot after a load
+
+        shard_passages = {}
+        for passage_id, passage in enumerate(self.passages):
+            shard_passages.setdefault(self.documents[passage.doc_id].category, []).append(passage_id)
+        self.shards = {
+            category: Shard(category, passage_ids, [self.passages[passage_id].text for passage_id in passage_ids])
+            for category, passage_ids in shard_passages.items()
+        }
+        self.unsharded = Shard(None, range(len(self.passages)), [passage.text for passage in self.passages])
+        self._summarize()
+
+    def _summarize(self):
+        self.all_content = [document.content for document in self.documents.values()]
+        self.category_content = {category: [] for category in self.categories}
+        for document in self.documents.values():
+            self.category_content.setdefault(document.category, []).append(document.content)
+
+    @property
+    def passage_count(self):
+        return len(self.passages) - len(self.removed)
+
+    def __getstate__(self):
+        # The vector index maps files on disk; it is reopened after unpickling
+        state = self.__dict__.copy()
+        state['vectors'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.version = next(_versions)
+
+    def attach_vectors(self, vectors):
+        """Give every shard its rows of a vector index built over all passages in order"""
+        self.vectors = vectors
+        for shard in [*self.shards.values(), self.unsharded]:
+            shard.vectors = vectors.subset(shard.passage_ids)
+
+    def search(self, query, max_results=3, mode='bm25', categories=None):
+        """
+        Top passages as [(score, passage_id)] from the shards of the given
+        categories (the unsharded index when None), plus {category: milliseconds}
+        """
+        if categories is None:
+            shards = {'all': self.unsharded}
+        else:
+            shards = {category: self.shards[category] for category in categories if category in self.shards}
+
+        ranked, shard_ms = [], {}
+        for category, shard in shards.items():
+            started = time.perf_counter()
+            ranked.extend(shard.search(query, max_results, mode))
+            shard_ms[category] = round((time.perf_counter() - started) * 1000, 3)
+
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked[:max_results], shard_ms
+
+    def context(self, query, max_results, max_tokens, mode='bm25', categories=None, routing=False):
+        """
+        Prompt context of whole passages within max_tokens, plus the retrieval
+        details: shards searched, how they were chosen, milliseconds per shard
+        and the context's token count. Without categories, routing picks the
+        shards with the intent classifier; otherwise the unsharded index is used.
+        """
+        classified = classify_query(query) if routing and not categories else []
+        if categories:
+            source = 'request'
+        elif classified:
+            source, categories = 'classifier', classified
+        else:
+            source, categories = 'all', None
+
+        # Extra candidates leave room for the near-duplicates that packing drops
+        ranked, shard_ms = self.search(query, max_results * 3, mode, categories)
+        separator_tokens = get_token_counter().count(SEPARATOR)
+        pack = lambda ranked: select_passages(self.passages, ranked, max_tokens, max_results,
+                                              self.passage_tokens, separator_tokens)
+        selected = pack(ranked)
+
+        if source == 'classifier' and len(selected) < max_results // 2:
+            # Shard and unsharded scores use different statistics, so the unsharded ranking replaces the shards'
+            ranked, more_ms = self.search(query, max_results * 3, mode)
+            selected = pack(ranked)
+            shard_ms.update(more_ms)
+            source = 'widened'
+
+        context_tokens = sum(self.passage_tokens[self.passage_ids[passage.text]] for passage in selected) \
+            + separator_tokens * max(len(selected) - 1, 0)
+        retrieval = {'categories': list(shard_ms), 'source': source, 'shard_ms': shard_ms,
+                     'context_tokens': context_tokens}
+        return SEPARATOR.join(passage.text for passage in selected), retrieval
+
+    def updated(self, upserts=(), deletes=()):
+        """
+        The next snapshot, with the Documents in upserts added or replaced and the
+        doc ids in deletes removed, plus (passages added, passages removed)
+        """
+        documents = dict(self.documents)
+        changed = set()  # ids of the documents whose content changes, aggregates included
+
+        changes = [(doc_id, None) for doc_id in deletes] + [(document.doc_id, document) for document in upserts]
+        for doc_id, document in changes:
+            old = documents.pop(doc_id, None) if document is None else documents.get(doc_id)
+            if old is not None:
+                changed.update(self._patch_aggregates(documents, old, document))
+            if document is not None:
+                documents[doc_id] = document
+            changed.add(doc_id)
+
+        # A text only goes when the last document producing it does; unchanged texts keep their ids
+        owners = dict(self.owners)
+        new_passages = []
+        for doc_id in changed:
+            old, document = self.documents.get(doc_id), documents.get(doc_id)
+            if old is not None and document is not None and old.content == document.content:
+                continue
+            for passage in _distinct_passages(old.content, doc_id) if old is not None else ():
+                owners[passage.text] -= 1
+            for passage in _distinct_passages(document.content, doc_id) if document is not None else ():
+                owners[passage.text] = owners.get(passage.text, 0) + 1
+                new_passages.append(passage)
+
+        passage_ids = dict(self.passage_ids)
+        removed_ids = set()
+        for text in [text for text, count in owners.items() if count == 0]:
+            del owners[text]
+            removed_ids.add(passage_ids.pop(text))
+        added = []
+        for passage in new_passages:
+            if passage.text not in passage_ids:
+                passage_ids[passage.text] = len(self.passages) + len(added)
+                added.append(passage)
+
+        removed = self.removed | removed_ids
+        if any(len(shard.bm25.segments) >= MAX_SEGMENTS for shard in [*self.shards.values(), self.unsharded]) or \
+                len(removed) > MAX_REMOVED_SHARE * (len(self.passages) + len(added)):
+            return self._compacted(documents), len(added), len(removed_ids)
+
+        shard_added = {}
+        for passage in added:
+            shard_added.setdefault(documents[passage.doc_id].category, []).append(passage)
+        shards = {}
+        for category in dict.fromkeys([*self.shards, *shard_added]):
+            shard = self.shards.get(category) or self._empty_shard(category)
+            passages = shard_added.get(category, [])
+            shards[category] = shard.extended([passage_ids[passage.text] for passage in passages],
+                                              [passage.text for passage in passages], removed_ids)
+
+        snapshot = copy.copy(self)
+        snapshot.version = next(_versions)
+        snapshot.documents = documents
+        snapshot.passages = self.passages + added
+        snapshot.passage_tokens = self.passage_tokens + [get_token_counter().count(passage.text) for passage in added]
+        snapshot.passage_ids = passage_ids
+        snapshot.owners = owners
+        snapshot.removed = removed
+        snapshot.shards = shards
+        snapshot.unsharded = self.unsharded.extended([passage_ids[passage.text] for passage in added],
+                                                     [passage.text for passage in added], removed_ids)
+        snapshot._summarize()
+        return snapshot, len(added), len(removed_ids)
+
+    def _empty_shard(self, category):
+        shard = Shard(category)
+        if self.vectors is not None:
+            shard.vectors = self.vectors.subset([])
+        return shard
+
+    def _patch_aggregates(self, documents, old, document):
+        """Replace (or drop) the old record inside other documents of its category; the ids patched"""
+        record = old.content.strip()
+        replacement = document.content.strip() if document is not None else ''
+        patched = []
+        for doc_id, other in documents.items():
+            if doc_id != old.doc_id and other.category == old.category and record in other.content:
+                documents[doc_id] = other._replace(content=other.content.replace(record, replacement))
+                patched.append(doc_id)
+        return patched
+
+    def _compacted(self, documents):
+        snapshot = KnowledgeSnapshot(documents.values(), self.categories)
+        if self.vectors is not None:
+            # Renumbered passages no longer line up with the offline-built rows
+            texts = [passage.text for passage in snapshot.passages]
+            embedder = self.vectors.embedder
+            snapshot.attach_vectors(VectorIndex(embedder.embed(texts).astype('float32'), embedder))
+        return snapshot
+
+
+def _distinct_passages(content, doc_id):
+    """A document's passages, each distinct text once"""
+    passages = {}
+    for passage in chunk_document(content, doc_id):
+        passages.setdefault(passage.text, passage)
+    return list(passages.values())
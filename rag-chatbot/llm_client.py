@@ -0,0 +1,216 @@
+"""
+Shared HTTP client for the OpenAI chat completions API
+One keep-alive requests.Session per process, so a chat message reuses a pooled
+connection instead of opening a new TCP+TLS connection to api.openai.com.
+
+- Separate connect and read timeouts
+- Connection errors, timeouts, 429 and 5xx are retried with full-jitter
+  exponential backoff, or after the server's Retry-After when it sends one
+- A circuit breaker fails fast after CIRCUIT_THRESHOLD consecutive failures,
+  then lets one trial request through every CIRCUIT_COOLDOWN seconds
+- stream() yields the reply as it is generated (stream=True); retries only
+  happen before the first byte, never in the middle of an answer
+- base_url is configurable (OPENAI_BASE_URL) so a local stand-in that speaks
+  the same API can be used in tests
+
+Both front ends get their client through get_llm_client(), so the pool and the
+breaker are shared by every chatbot instance in the process.
+"""
+
+import json
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = 'https://api.openai.com/v1'
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 3  # attempts per request
+POOL_SIZE = 10
+BACKOFF_BASE = 1.0  # seconds; attempt n waits up to BACKOFF_BASE * 2 ** n
+MAX_RETRY_AFTER = 20.0  # a longer Retry-After fails the request instead of waiting
+RETRY_STATUSES = frozenset([408, 409, 429, 500, 502, 503, 504])
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30.0
+
+
+class LLMError(Exception):
+    """A failed completion request; status is the HTTP status, None when there was no response"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(LLMError):
+    """The upstream failed repeatedly; requests fail fast until the cooldown ends"""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=CIRCUIT_THRESHOLD, cooldown=CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0  # consecutive
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'open' if time.monotonic() - self.opened_at < self.cooldown else 'half-open'
+
+    def allow(self):
+        """False while open; after the cooldown one trial request is let through"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.opened_at = time.monotonic()  # the others keep failing fast until it succeeds
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def retry_after_seconds(response):
+    """The Retry-After header (seconds or an HTTP date) in seconds, None when absent or invalid"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max(1, max_retries)
+        self.breaker = CircuitBreaker()
+        self.requests = 0
+        self.retries = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def post(self, path, payload, max_retries=None, **kwargs):
+        """POST with retries; the successful response, else LLMError"""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempts = self.max_retries if max_retries is None else max(1, max_retries)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError("OpenAI API unavailable (circuit open after repeated failures)")
+            self.requests += 1
+            delay = None
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.breaker.record_failure()
+                error = LLMError(f"Connection error: {str(e)}")
+            else:
+                if response.status_code == 200:
+                    self.breaker.record_success()
+                    return response
+                error = LLMError(f"OpenAI API error (code {response.status_code}): {response.text[:300]}",
+                                 response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    # The request itself is wrong (bad key, bad payload); the upstream is up
+                    self.breaker.record_success()
+                    raise error
+                self.breaker.record_failure()
+                delay = retry_after_seconds(response)
+
+            if attempt == attempts - 1 or (delay is not None and delay > MAX_RETRY_AFTER):
+                raise error
+            self.retries += 1
+            time.sleep(delay if delay is not None else random.uniform(0, BACKOFF_BASE * 2 ** attempt))
+
+    def complete(self, payload, max_retries=None):
+        """The reply text of a chat completion request"""
+        response = self.post('chat/completions', payload, max_retries)
+        try:
+            return response.json()['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            # A 200 with a body that isn't a completion (e.g. an HTML page from a proxy)
+            self.breaker.record_failure()
+            raise LLMError(f"Unexpected OpenAI API response: {response.text[:300]}") from e
+
+    def stream(self, payload):
+        """The reply text of a chat completion request piece by piece, as the model generates it"""
+        response = self.post('chat/completions', {**payload, 'stream': True}, stream=True)
+        try:
+            for line in response.iter_lines():
+                # Server-sent events: "data: {chunk}" lines, ended by "data: [DONE]"
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[len(b'data:'):].strip()
+                if data == b'[DONE]':
+                    return
+                content = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                if content:
+                    yield content
+        except requests.exceptions.RequestException as e:
+            raise LLMError(f"Stream interrupted: {str(e)}") from e
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Unexpected OpenAI API stream chunk: {str(e)}") from e
+        finally:
+            response.close()
+
+    def ping(self, model):
+        """Whether a minimal completion succeeds (no retries)"""
+        try:
+            self.complete({
+                "model": model,
+                "messages": [{"role": "user", "content": "Test connection"}],
+                "max_tokens": 10
+            }, max_retries=1)
+            return True
+        except LLMError:
+            return False
+
+    def stats(self):
+        return {
+            'base_url': self.base_url,
+            'connect_timeout': self.timeout[0],
+            'read_timeout': self.timeout[1],
+            'max_retries': self.max_retries,
+            'circuit': self.breaker.state,
+            'requests': self.requests,
+            'retries': self.retries,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_llm_client(api_key, base_url=DEFAULT_BASE_URL, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                   read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES):
+    """One shared client (connection pool and circuit breaker) per configuration"""
+    return LLMClient(api_key, base_url, connect_timeout, read_timeout, max_retries)
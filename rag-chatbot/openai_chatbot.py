@@ -7,30 +7,79 @@ import streamlit as st
 import os
 import glob
 import json
-import requests
 import time
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 
+from answer_cache import DEFAULT_CACHE_PATH as DEFAULT_ANSWER_CACHE_PATH, DEFAULT_SIMILARITY, \
+    DEFAULT_TTL_SECONDS, AnswerCache, context_fingerprint
+from context_cache import DEFAULT_MAX_ENTRIES, ContextCache, normalize_query
+from index_cache import DEFAULT_CACHE_PATH, corpus_hash, load_snapshot, save_snapshot
+from knowledge_index import RETRIEVAL_MODES
+from knowledge_store import Document, KnowledgeSnapshot
+from llm_client import DEFAULT_BASE_URL, DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_READ_TIMEOUT, \
+    LLMError, get_llm_client
+from passages import SEPARATOR
+from quick_questions import QUICK_QUESTIONS, QUICK_QUESTIONS_1, QUICK_QUESTIONS_2, QUICK_QUESTIONS_3
+from token_budget import MODEL_CONTEXT_TOKENS, fit_parts, get_token_counter
+from vector_index import DEFAULT_INDEX_DIR, VectorIndex
+
 # Load environment variables
 load_dotenv()
 
 # OpenAI API configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your_openai_api_key_here")
-OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
+# A local stand-in for the OpenAI API can be used by pointing this at it
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL)
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+
+# 'bm25' (ranked), 'keyword' (original substring-count scorer) or 'dense' (vector index)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "bm25")
+# Built offline with: python vector_index.py build
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", DEFAULT_INDEX_DIR)
+# Loaded indexes are reused from here while the knowledge base is unchanged
+INDEX_CACHE_PATH = os.getenv("INDEX_CACHE_PATH", DEFAULT_CACHE_PATH)
+# Packed contexts of recent queries, dropped whenever the knowledge base changes
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+# 1: search only the category shards the question's intent picks (fewer tokens, lower
+# coverage; see context_benchmark.py); 0, the default, searches the whole knowledge base
+INTENT_ROUTING = os.getenv("INTENT_ROUTING", "0") == "1"
+# Answers to repeated questions over the same context; shared with the API
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", DEFAULT_ANSWER_CACHE_PATH)
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", DEFAULT_TTL_SECONDS))
+# Cosine similarity (e.g. 0.9) for a near-duplicate question to count as a hit; 0, the default, disables
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", DEFAULT_SIMILARITY))
+
+class AIServiceError(Exception):
+    """The OpenAI call failed; the message is the apology shown to the user"""
 
 class CMPTravelChatbotOpenAI:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, retrieval_mode=None):
         self.api_key = api_key or OPENAI_API_KEY
+        self.retrieval_mode = retrieval_mode or RETRIEVAL_MODE
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {self.retrieval_mode}")
         self.knowledge_base_path = "knowledge-base-travel"
-        self.all_content = []
-        self.category_content = {}
+        # Documents, passages and indexes; replaced as a whole on every load
+        self.knowledge = KnowledgeSnapshot()
+        self.startup = None  # how long load_all_content took and whether the index cache was used
+        self.context_cache = ContextCache(CONTEXT_CACHE_SIZE)
+        try:
+            self.answer_cache = AnswerCache(ANSWER_CACHE_PATH, ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY)
+        except Exception as e:
+            st.warning(f"⚠️ Answer cache not persisted: {str(e)}")
+            self.answer_cache = AnswerCache(None, ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY)
+        self.model = "gpt-3.5-turbo"
+        self.token_counter = get_token_counter(self.model)
+        self.max_response_tokens = 800
+        self.max_context_tokens = 1600  # Well under the model limit to keep requests cheap
         
-        # OpenAI headers
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        # Pooled keep-alive connections to OpenAI, shared with every other instance
+        self.llm = get_llm_client(self.api_key, OPENAI_BASE_URL, OPENAI_CONNECT_TIMEOUT, OPENAI_READ_TIMEOUT,
+                                  OPENAI_MAX_RETRIES)
         
         self.system_prompt = """
 You are CMP Travel AI Assistant, a professional travel consultant powered by OpenAI GPT.
@@ -54,79 +103,61 @@ CMP Travel Contact:
 Remember: You represent CMP Travel brand. Be professional and helpful!
 """
 
-    def estimate_tokens(self, text):
-        """Rough token estimation (1 token ≈ 4 characters for English)"""
-        return len(text) // 4
-
-    def call_openai_api(self, user_message, context=""):
-        """Call OpenAI API with retry mechanism and token management"""
-        
-        # Calculate token estimates
-        system_tokens = self.estimate_tokens(self.system_prompt)
-        user_tokens = self.estimate_tokens(user_message)
-        context_tokens = self.estimate_tokens(context)
-        
-        # Total input tokens (leave 800 for response)
-        max_input_tokens = 16385 - 800
-        current_tokens = system_tokens + user_tokens + context_tokens + 50  # buffer
-        
-        # Truncate context if needed
-        if current_tokens > max_input_tokens:
-            # Calculate how much context we can keep
-            available_for_context = max_input_tokens - system_tokens - user_tokens - 50
-            max_context_chars = available_for_context * 4  # Convert back to chars
-            
-            if max_context_chars > 0:
-                context = context[:max_context_chars] + "\n\n... (truncated)"
-            else:
-                context = "Limited context due to length constraints."
-        
+    def build_messages(self, user_message, context):
         full_prompt = f"""Context: {context}
 
 User: {user_message}
 
 Response:"""
-
-        payload = {
-            "model": "gpt-3.5-turbo",
-            "messages": [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": full_prompt}
-            ],
-            "max_tokens": 800,
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": full_prompt}
+        ]
+
+    def context_budget(self, user_message):
+        """Tokens left for context after the system prompt, the question and the reply"""
+        prompt_tokens = self.token_counter.count_messages(self.build_messages(user_message, ""))
+        return max(0, MODEL_CONTEXT_TOKENS[self.model] - self.max_response_tokens - prompt_tokens)
+
+    def build_payload(self, user_message, context="", context_tokens=None):
+        """Chat completion request body with token management"""
+        
+        # Drop whole passages from the end if the context doesn't fit (never cut mid-word)
+        budget = self.context_budget(user_message)
+        if context_tokens is None:
+            context_tokens = self.token_counter.count(context)
+        if context_tokens > budget:
+            context = fit_parts(context.split(SEPARATOR), SEPARATOR, budget, self.token_counter) \
+                or "Limited context due to length constraints."
+
+        return {
+            "model": self.model,
+            "messages": self.build_messages(user_message, context),
+            "max_tokens": self.max_response_tokens,
             "temperature": 0.7
         }
 
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    OPENAI_API_URL,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result['choices'][0]['message']['content']
-                else:
-                    error_info = response.json() if response.content else {"error": "Unknown error"}
-                    st.error(f"❌ OpenAI API Error (Code {response.status_code}): {error_info}")
-                    
-                    if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)  # Exponential backoff
-                        continue
-                    else:
-                        return "Sorry, I'm experiencing technical difficulties. Please try again in a moment."
-                        
-            except requests.exceptions.RequestException as e:
-                st.error(f"❌ Connection Error: {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    return "Sorry, I'm unable to connect to the AI service right now. Please try again later."
+    def service_error(self, error):
+        """Show a failed OpenAI request; the AIServiceError (apology for the user) to raise"""
+        st.error(f"❌ {str(error)}")
+        if error.status is None:
+            return AIServiceError("Sorry, I'm unable to connect to the AI service right now. Please try again later.")
+        return AIServiceError("Sorry, I'm experiencing technical difficulties. Please try again in a moment.")
+
+    def call_openai_api(self, user_message, context="", context_tokens=None):
+        """Call OpenAI API; raises AIServiceError when it fails"""
+        # Retries with jittered backoff (honouring Retry-After) happen inside the client
+        try:
+            return self.llm.complete(self.build_payload(user_message, context, context_tokens))
+        except LLMError as e:
+            raise self.service_error(e) from e
+
+    def stream_openai_api(self, user_message, context="", context_tokens=None):
+        """Call OpenAI API with stream=True, yielding the answer as it is generated; raises AIServiceError"""
+        try:
+            yield from self.llm.stream(self.build_payload(user_message, context, context_tokens))
+        except LLMError as e:
+            raise self.service_error(e) from e
 
     def load_all_content(self):
         """Load all content from knowledge base"""
@@ -134,94 +165,154 @@ Response:"""
             st.error(f"❌ Knowledge base not found at {self.knowledge_base_path}")
             return 0
 
+        started = time.perf_counter()
         categories = ['tours', 'hotels', 'blogs', 'guides', 'general']
-        total_loaded = 0
+
+        # Skip re-reading and re-indexing when no knowledge base file has changed
+        digest = corpus_hash(self.knowledge_base_path, categories)
+        knowledge = load_snapshot(INDEX_CACHE_PATH, digest)
+        if knowledge is not None:
+            self.open_vector_index(knowledge)
+            self.knowledge = knowledge
+            self.startup = {'seconds': time.perf_counter() - started, 'index_cache': 'hit'}
+            return len(knowledge.all_content)
+
+        documents = []
 
         for category in categories:
             category_path = f"{self.knowledge_base_path}/{category}"
             if os.path.exists(category_path):
                 files = glob.glob(f"{category_path}/*.txt")
-                category_content = []
                 
                 for file_path in files:
                     try:
                         with open(file_path, 'r', encoding='utf-8') as f:
                             content = f.read()
                             if content.strip():
-                                category_content.append(content)
-                                self.all_content.append(content)
-                                total_loaded += 1
+                                documents.append(Document(Path(file_path).stem, category, content))
                     except Exception as e:
                         st.warning(f"⚠️ Cannot read file {file_path}: {str(e)}")
-                
-                self.category_content[category] = category_content
 
-        return total_loaded
+        # Retrieval works on section-aware passages rather than whole files
+        knowledge = KnowledgeSnapshot(documents, categories)
 
-    def get_relevant_context(self, query, max_results=3):
-        """Get relevant context from knowledge base with token limit"""
-        query_lower = query.lower()
-        relevant_content = []
-        
-        # Score content based on keyword matches
-        scored_content = []
-        for content in self.all_content:
-            content_lower = content.lower()
-            score = 0
-            
-            # Search for query terms
-            query_terms = query_lower.split()
-            for term in query_terms:
-                if term in content_lower:
-                    score += content_lower.count(term)
-            
-            if score > 0:
-                scored_content.append((score, content))
-        
-        # Sort by score and get top results
-        scored_content.sort(key=lambda x: x[0], reverse=True)
-        
-        # Limit context length to avoid token limit
-        total_chars = 0
-        max_chars = 8000  # Roughly 2000 tokens to stay safe
-        
-        for _, content in scored_content[:max_results]:
-            if total_chars + len(content) < max_chars:
-                relevant_content.append(content[:1500])  # Truncate individual content
-                total_chars += len(content[:1500])
-            else:
-                break
-        
-        return "\n\n---\n\n".join(relevant_content)
+        try:
+            save_snapshot(INDEX_CACHE_PATH, digest, knowledge)
+        except Exception as e:
+            st.warning(f"⚠️ Cannot save index cache: {str(e)}")
+
+        self.open_vector_index(knowledge)
+        self.knowledge = knowledge
+        self.startup = {'seconds': time.perf_counter() - started, 'index_cache': 'miss'}
+        return len(documents)
+
+    def open_vector_index(self, knowledge):
+        """Memory-mapped, so opening it costs nothing until a dense query touches it"""
+        if os.path.exists(VECTOR_INDEX_DIR):
+            try:
+                knowledge.attach_vectors(VectorIndex.open(VECTOR_INDEX_DIR,
+                                                          [passage.text for passage in knowledge.passages]))
+            except Exception as e:
+                st.warning(f"⚠️ Vector index not used: {str(e)}")
+
+    def get_relevant_context(self, query, max_results=10, max_tokens=None):
+        """Get relevant context from knowledge base with token limit, plus its token count"""
+        # Whole passages packed by their token counts, cached at index time
+        max_tokens = self.max_context_tokens if max_tokens is None else min(max_tokens, self.max_context_tokens)
+        knowledge = self.knowledge
+
+        # Repeated questions (the quick-question buttons) reuse the packed context
+        key = (normalize_query(query), self.retrieval_mode, max_results, max_tokens)
+        cached = self.context_cache.get(key, knowledge.version)
+        if cached is not None:
+            return cached
+
+        # With INTENT_ROUTING, only the category shards the question is about (all when unclear)
+        context, retrieval = knowledge.context(query, max_results, max_tokens, self.retrieval_mode,
+                                               routing=INTENT_ROUTING)
+        self.context_cache.put(key, knowledge.version, (context, retrieval['context_tokens']))
+        return context, retrieval['context_tokens']
 
     def chat(self, user_input):
         """Main chat function"""
-        if not self.all_content:
+        if not self.knowledge.all_content:
             return "❌ Knowledge base not loaded. Please initialize the chatbot first."
         
-        # Get relevant context
-        context = self.get_relevant_context(user_input)
+        # Get relevant context, sized to what the prompt has room for
+        context, context_tokens = self.get_relevant_context(user_input, max_tokens=self.context_budget(user_input))
         
-        # Call OpenAI API
-        response = self.call_openai_api(user_input, context)
+        # The same question over the same context was answered before
+        fingerprint = context_fingerprint(context)
+        response = self.answer_cache.get(user_input, fingerprint)
+        if response is not None:
+            return response
+
+        # Call OpenAI API; only real answers are cached, never the apology for a failure
+        try:
+            response = self.call_openai_api(user_input, context, context_tokens)
+        except AIServiceError as e:
+            return str(e)
+        self.answer_cache.put(user_input, fingerprint, response)
         return response
 
+    def chat_stream(self, user_input):
+        """
+        Streaming chat: yields ('delta', text) for each piece of the answer as it
+        arrives, then ('done', timings) with the time to the first piece and the
+        total time, or ('error', message)
+        """
+        started = time.perf_counter()
+        if not self.knowledge.all_content:
+            yield 'error', "❌ Knowledge base not loaded. Please initialize the chatbot first."
+            return
+
+        context, context_tokens = self.get_relevant_context(user_input, max_tokens=self.context_budget(user_input))
+        fingerprint = context_fingerprint(context)
+        cached = self.answer_cache.get(user_input, fingerprint)
+
+        # A cached answer arrives as a single piece
+        pieces = [cached] if cached is not None else self.stream_openai_api(user_input, context, context_tokens)
+        answer, first_piece = [], None
+        try:
+            for piece in pieces:
+                if first_piece is None:
+                    first_piece = time.perf_counter()
+                answer.append(piece)
+                yield 'delta', piece
+        except AIServiceError as e:
+            # Whatever was streamed before the failure is not cached
+            yield 'error', str(e)
+            return
+
+        if cached is None:
+            self.answer_cache.put(user_input, fingerprint, ''.join(answer))
+        finished = time.perf_counter()
+        yield 'done', {
+            'ttft_ms': round(((first_piece or finished) - started) * 1000, 2),
+            'total_ms': round((finished - started) * 1000, 2),
+            'answer_cache': 'miss' if cached is None else 'hit',
+        }
+
+    def prewarm_answers(self, questions):
+        """Answer the questions not cached yet; stops at the first AI service error"""
+        answered = 0
+        for question in questions:
+            context, context_tokens = self.get_relevant_context(question, max_tokens=self.context_budget(question))
+            fingerprint = context_fingerprint(context)
+            if self.answer_cache.get(question, fingerprint) is not None:
+                continue
+            # Runs in a background thread, where st.error can't show anything
+            try:
+                response = self.llm.complete(self.build_payload(question, context, context_tokens))
+            except LLMError:
+                break
+            self.answer_cache.put(question, fingerprint, response)
+            answered += 1
+        return answered
+
     def test_api_connection(self):
         """Test OpenAI API connection"""
-        try:
-            response = requests.post(
-                OPENAI_API_URL,
-                headers=self.headers,
-                json={
-                    "model": "gpt-3.5-turbo",
-                    "messages": [{"role": "user", "content": "Test connection"}],
-                    "max_tokens": 10
-                },
-                timeout=10
-            )
-            return response.status_code == 200
-        except:
-            return False
+        return self.llm.ping(self.model)
 
 def main():
     st.set_page_config(
@@ -246,6 +337,16 @@ def main():
     with st.sidebar:
         st.markdown("### ⚙️ Settings")
         
+        retrieval_mode = st.selectbox(
+            "🔎 Retrieval mode",
+            RETRIEVAL_MODES,
+            index=RETRIEVAL_MODES.index(RETRIEVAL_MODE) if RETRIEVAL_MODE in RETRIEVAL_MODES else 0,
+            help="bm25: ranked retrieval | keyword: original keyword-count scoring | "
+                 "dense: vector index (python vector_index.py build)"
+        )
+        if st.session_state.get('chatbot'):
+            st.session_state.chatbot.retrieval_mode = retrieval_mode
+        
         # API Status
         st.markdown("### 🔗 API Status")
         if st.button("🧪 Test OpenAI Connection"):
@@ -263,7 +364,8 @@ def main():
             st.success("✅ **Ready to serve!**")
             
             # Display statistics
-            categories = list(st.session_state.chatbot.category_content.keys())
+            category_content = st.session_state.chatbot.knowledge.category_content
+            categories = list(category_content.keys())
             if categories:
                 st.markdown("**📊 Loaded data:**")
                 emojis = {
@@ -276,12 +378,19 @@ def main():
                 
                 total_items = 0
                 for cat in categories:
-                    count = len(st.session_state.chatbot.category_content[cat])
+                    count = len(category_content[cat])
                     total_items += count
                     emoji = emojis.get(cat, '📄')
                     st.markdown(f"{emoji} **{cat.title()}:** `{count}` items")
                 
                 st.info(f"🎯 **Total:** {total_items} documents")
+                
+                cache_stats = st.session_state.chatbot.context_cache.stats()
+                st.caption(f"⚡ Context cache: {cache_stats['hit_ratio']:.0%} hits "
+                           f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})")
+                answer_stats = st.session_state.chatbot.answer_cache.stats()
+                st.caption(f"💾 Answer cache: {answer_stats['entries']} answers, "
+                           f"{answer_stats['hit_ratio']:.0%} hits")
         else:
             st.markdown("### ⏳ Waiting to Start")
             st.warning("🔄 Bot not initialized yet")
@@ -310,12 +419,17 @@ def main():
         if setup_clicked:
             with st.spinner("🔄 Initializing OpenAI chatbot..."):
                 try:
-                    chatbot = CMPTravelChatbotOpenAI()
+                    chatbot = CMPTravelChatbotOpenAI(retrieval_mode=retrieval_mode)
                     content_count = chatbot.load_all_content()
                     
                     if content_count > 0:
+                        # In the background, so Initialize doesn't wait for up to 12 completions;
+                        # cached answers persist, so after the first start this only asks about expired ones
+                        threading.Thread(target=chatbot.prewarm_answers, args=(QUICK_QUESTIONS,),
+                                         daemon=True).start()
                         st.session_state.chatbot = chatbot
-                        st.success(f"🎉 Initialization successful! Loaded {content_count} documents")
+                        st.success(f"🎉 Initialization successful! Loaded {content_count} documents "
+                                   f"in {chatbot.startup['seconds'] * 1000:.0f} ms (index cache {chatbot.startup['index_cache']})")
                         st.balloons()
                         st.rerun()
                     else:
@@ -489,7 +603,7 @@ def main():
         return
 
     # Chat interface
-    if not st.session_state.chatbot.all_content:
+    if not st.session_state.chatbot.knowledge.all_content:
         st.error("❌ No data available for chat. Please check knowledge base!")
         return
 
@@ -519,18 +633,28 @@ def main():
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
-    # Chat input
-    if prompt := st.chat_input("💬 Ask me anything about travel..."):
+    # Chat input; a quick question button clicked on the previous run counts as typed
+    if prompt := st.chat_input("💬 Ask me anything about travel...") or st.session_state.pop('pending_question', None):
         # Add user message
         st.session_state.messages.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Get bot response
+        # Get bot response, rendered as it streams in
         with st.chat_message("assistant"):
-            with st.spinner("🤖 AI is analyzing and consulting for you..."):
-                response = st.session_state.chatbot.chat(prompt)
-                st.markdown(response)
+            placeholder = st.empty()
+            placeholder.markdown("🤖 AI is analyzing and consulting for you...")
+            response = ""
+            for event, data in st.session_state.chatbot.chat_stream(prompt):
+                if event == 'delta':
+                    response += data
+                    placeholder.markdown(response + "▌")
+                elif event == 'error':
+                    response = data
+                else:
+                    st.caption(f"⚡ First token {data['ttft_ms']:.0f} ms · total {data['total_ms']:.0f} ms"
+                               + (" · cached answer" if data['answer_cache'] == 'hit' else ""))
+            placeholder.markdown(response)
         
         # Add assistant response
         st.session_state.messages.append({"role": "assistant", "content": response})
@@ -542,49 +666,31 @@ def main():
     # Row 1: Popular categories
     col1, col2, col3, col4 = st.columns(4)
     
-    quick_questions_1 = [
-        ("🏖️ HOT Tours", "Top 5 hottest travel tours from CMP Travel"),
-        ("🏨 5⭐ Resorts", "Best 5-star resorts in Vietnam with spa and casino"),
-        ("💰 Best Prices", "Best tour + hotel combo deals this month"),
-        ("📞 Contact Now", "CMP Travel contact information and office address")
-    ]
-    
-    for i, (btn_text, question) in enumerate(quick_questions_1):
+    for i, (btn_text, question) in enumerate(QUICK_QUESTIONS_1):
         with [col1, col2, col3, col4][i]:
             if st.button(btn_text, key=f"quick1_{i}", use_container_width=True):
-                st.session_state.messages.append({"role": "user", "content": question})
+                # Answered on the rerun like typed input, streamed (pre-warmed, so usually from the cache)
+                st.session_state.pending_question = question
                 st.rerun()
 
     # Row 2: Specific needs
     col1, col2, col3, col4 = st.columns(4)
     
-    quick_questions_2 = [
-        ("👨‍👩‍👧‍👦 Family", "Family tours with children under 12, safe and fun"),
-        ("🏔️ North Vietnam", "Northern Vietnam exploration tour: Hanoi - Sapa - Ha Long 5D4N"),
-        ("🏝️ Pearl Island", "Most beautiful Phu Quoc resorts with private beach and VIP services"),
-        ("💡 Free Advice", "Free consultation for 7-day romantic honeymoon itinerary")
-    ]
-    
-    for i, (btn_text, question) in enumerate(quick_questions_2):
+    for i, (btn_text, question) in enumerate(QUICK_QUESTIONS_2):
         with [col1, col2, col3, col4][i]:
             if st.button(btn_text, key=f"quick2_{i}", use_container_width=True):
-                st.session_state.messages.append({"role": "user", "content": question})
+                # Answered on the rerun like typed input, streamed (pre-warmed, so usually from the cache)
+                st.session_state.pending_question = question
                 st.rerun()
 
     # Row 3: Special services
     col1, col2, col3, col4 = st.columns(4)
     
-    quick_questions_3 = [
-        ("🎯 Personalized", "Design private tours based on personal preferences"),
-        ("✈️ Visa Express", "Fast visa services for Europe and Asia countries"),
-        ("🎉 Events", "Organize team building tours for 50-person companies"),
-        ("🌟 VIP Service", "VIP package: private car, private guide, priority check-in")
-    ]
-    
-    for i, (btn_text, question) in enumerate(quick_questions_3):
+    for i, (btn_text, question) in enumerate(QUICK_QUESTIONS_3):
         with [col1, col2, col3, col4][i]:
             if st.button(btn_text, key=f"quick3_{i}", use_container_width=True):
-                st.session_state.messages.append({"role": "user", "content": question})
+                # Answered on the rerun like typed input, streamed (pre-warmed, so usually from the cache)
+                st.session_state.pending_question = question
                 st.rerun()
 
 if __name__ == "__main__":
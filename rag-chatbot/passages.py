@@ -0,0 +1,174 @@
+"""
+Section-aware passage chunking for the travel knowledge base
+Documents are split at load time into passages, one per section ("Highlights:",
+"Detailed Itinerary:", "Package Includes:", blog <h2> headings, ...), and every
+passage starts with its record's title line ("TOUR: Maldives") so it stands
+on its own. Retrieval then ranks passages instead of whole documents, and the
+context is packed from whole passages instead of the first 1200 characters.
+
+- The all_*.txt aggregates concatenate records ('=====' lines, or a new
+  "TOUR: ..." style title line); each record is chunked separately, and
+  passages repeated verbatim across files are indexed once.
+- Sections longer than max_chars are split on line/sentence boundaries into
+  windows that overlap by up to overlap_chars.
+- Near-duplicate passages (the same boilerplate under different tours) are
+  collapsed when the context is packed.
+"""
+
+import re
+import zlib
+from collections import namedtuple
+
+MAX_PASSAGE_CHARS = 700
+OVERLAP_CHARS = 150
+MIN_SECTION_CHARS = 40  # smaller sections are folded into the next one
+NEAR_DUPLICATE_SIMILARITY = 0.8
+SEPARATOR = '\n\n---\n\n'
+
+Passage = namedtuple('Passage', ['text', 'doc_id', 'title', 'section', 'shingles'])
+
+# '=====' rules, or an upper-case "LABEL: value" title line starting the next record
+_RECORD_SEPARATOR = re.compile(r'={10,}|^(?=[A-Z][A-Z ]{2,}: \S)', re.MULTILINE)
+_HEADING = re.compile(r'^\s*([A-Za-z][A-Za-z &/()-]{1,40}):\s*$')
+_HTML_HEADING = re.compile(r'<h[1-6][^>]*>(.*?)</h[1-6]>', re.IGNORECASE | re.DOTALL)
+_HTML_TAG = re.compile(r'<[^>]+>')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_WORD = re.compile(r'\w+')
+
+
+def _clean(text):
+    """Turn HTML headings into section headings and drop the remaining tags"""
+    text = _HTML_HEADING.sub(lambda m: f"\n{_HTML_TAG.sub('', m.group(1)).strip()}:\n", text)
+    return _HTML_TAG.sub('', text)
+
+
+def _shingles(text):
+    """Hashes of word 3-grams, for near-duplicate detection"""
+    words = _WORD.findall(text.lower())
+    if len(words) < 3:
+        return frozenset([zlib.crc32(' '.join(words).encode('utf-8'))])
+    return frozenset(zlib.crc32(' '.join(words[i:i + 3]).encode('utf-8')) for i in range(len(words) - 2))
+
+
+def _units(lines, max_chars):
+    """Lines, with over-long lines split into sentences and then into word runs"""
+    for line in lines:
+        if len(line) <= max_chars:
+            yield line
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                yield sentence[:cut]
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                yield sentence
+
+
+def _windows(lines, max_chars, overlap_chars):
+    """Pack lines into windows of at most max_chars, repeating up to overlap_chars of tail lines"""
+    window, size = [], 0
+    for unit in _units(lines, max_chars):
+        if window and size + len(unit) + 1 > max_chars:
+            yield '\n'.join(window)
+            overlap, overlap_size = [], 0
+            for previous in reversed(window):
+                if overlap_size + len(previous) + 1 > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += len(previous) + 1
+            window, size = overlap, overlap_size
+        window.append(unit)
+        size += len(unit) + 1
+    if window:
+        yield '\n'.join(window)
+
+
+def _sections(record):
+    """(title, [(heading or None, [body lines])]) for one record"""
+    lines = [line.rstrip() for line in _clean(record).splitlines()]
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return None, []
+
+    title, sections = lines[0].strip(), [(None, [])]
+    for line in lines[1:]:
+        match = _HEADING.match(line)
+        if match:
+            sections.append((match.group(1), []))
+        else:
+            sections[-1][1].append(line.strip())
+    return title, sections
+
+
+def chunk_document(document, doc_id=0, max_chars=MAX_PASSAGE_CHARS, overlap_chars=OVERLAP_CHARS):
+    """Passages for one knowledge base file"""
+    passages = []
+    for record in _RECORD_SEPARATOR.split(document):
+        title, sections = _sections(record)
+        pending = []  # lines of tiny sections waiting to be folded into the next one
+        for index, (heading, body) in enumerate(sections):
+            lines = pending + ([f"{heading}:"] if heading else []) + body
+            if not body or (sum(len(line) for line in lines) < MIN_SECTION_CHARS and index < len(sections) - 1):
+                pending = lines
+                continue
+            pending = []
+
+            for window in _windows(lines, max_chars - len(title) - 1, overlap_chars):
+                passages.append(Passage(f"{title}\n{window}", doc_id, title, heading, _shingles(window)))
+
+        if any(not _HEADING.match(line) for line in pending):
+            window = '\n'.join(pending)
+            passages.append(Passage(f"{title}\n{window}", doc_id, title, None, _shingles(window)))
+        elif title and not sections[0][1] and len(sections) == 1:
+            # A record with nothing but a title line
+            passages.append(Passage(title, doc_id, title, None, _shingles(title)))
+    return passages
+
+
+def chunk_documents(documents, max_chars=MAX_PASSAGE_CHARS, overlap_chars=OVERLAP_CHARS, doc_ids=None):
+    """Passages for every document in order, each distinct passage text once"""
+    passages, seen = [], set()
+    for doc_id, document in zip(doc_ids if doc_ids is not None else range(len(documents)), documents):
+        for passage in chunk_document(document, doc_id, max_chars, overlap_chars):
+            if passage.text not in seen:
+                seen.add(passage.text)
+                passages.append(passage)
+    return passages
+
+
+def is_near_duplicate(passage, selected, threshold=NEAR_DUPLICATE_SIMILARITY):
+    """True if the passage body has Jaccard similarity >= threshold with any selected passage"""
+    for other in selected:
+        overlap = len(passage.shingles & other.shingles)
+        if overlap and overlap / len(passage.shingles | other.shingles) >= threshold:
+            return True
+    return False
+
+
+def pack_passages(passages, ranked, max_chars, max_passages):
+    """
+    Context from ranked [(score, passage_id)]: whole passages in rank order,
+    skipping near-duplicates and passages that no longer fit in max_chars
+    """
+    return SEPARATOR.join(passage.text for passage in select_passages(passages, ranked, max_chars, max_passages))
+
+
+def select_passages(passages, ranked, budget, max_passages, sizes=None, separator_size=len(SEPARATOR)):
+    """
+    The passages pack_passages joins, picked greedily in rank order. sizes[passage_id]
+    is a passage's cost against the budget, its length in characters by default
+    (knowledge_store.py passes cached token counts).
+    """
+    selected, total = [], 0
+    for _, passage_id in ranked:
+        passage = passages[passage_id]
+        size = sizes[passage_id] if sizes is not None else len(passage.text)
+        if total + size + separator_size > budget or is_near_duplicate(passage, selected):
+            continue
+        selected.append(passage)
+        total += size + separator_size
+        if len(selected) >= max_passages:
+            break
+    return selected
@@ -0,0 +1,53 @@
+"""
+Keyword intent classifier that picks the knowledge base shards for a question
+"Boutique hotels in Ho Chi Minh City" only needs the hotels shard; a question
+with no category words ("Maldives") searches every shard.
+
+Each term is a word prefix ("resort" also matches "resorts") or a phrase of
+word prefixes ("tour guide"). Longer terms are matched first and consume their
+words, so "tour guide" counts for guides and not also for tours.
+
+    python query_intent.py "Which tour guide speaks French?"
+"""
+
+import sys
+
+from knowledge_index import CATEGORIES, tokenize
+
+CATEGORY_TERMS = {
+    'tours': ['tour', 'itinerar', 'trip', 'package', 'excursion', 'honeymoon', 'combo', 'team building',
+              'du lịch', 'lịch trình', 'chuyến đi'],
+    'hotels': ['hotel', 'resort', 'room', 'accommodation', 'stay', 'villa', 'homestay', 'hostel', 'suite',
+               'khách sạn', 'phòng', 'nghỉ dưỡng'],
+    'blogs': ['blog', 'tip', 'best time', 'weather', 'climate', 'things to do', 'kinh nghiệm', 'cẩm nang'],
+    'guides': ['tour guide', 'guide', 'speak', 'language', 'interpreter', 'hướng dẫn viên'],
+    'general': ['contact', 'hotline', 'email', 'address', 'office', 'company', 'polic', 'cancel', 'refund',
+                'visa', 'payment', 'insurance', 'liên hệ', 'chính sách', 'hoàn tiền'],
+}
+
+# (term words, category), longest first
+_TERMS = sorted(((tuple(tokenize(term)), category)
+                 for category, terms in CATEGORY_TERMS.items() for term in terms),
+                key=lambda item: -len(item[0]))
+
+
+def classify_query(query):
+    """Categories the query is about, most mentioned first; [] when it names none"""
+    words = tokenize(query)
+    used = [False] * len(words)
+    hits = dict.fromkeys(CATEGORIES, 0)
+
+    for term, category in _TERMS:
+        for start in range(len(words) - len(term) + 1):
+            span = range(start, start + len(term))
+            if not any(used[i] for i in span) and all(words[i].startswith(part) for i, part in zip(span, term)):
+                hits[category] += 1
+                for i in span:
+                    used[i] = True
+
+    return sorted((category for category in CATEGORIES if hits[category]), key=lambda category: -hits[category])
+
+
+if __name__ == '__main__':
+    for question in sys.argv[1:]:
+        print(f"{', '.join(classify_query(question)) or '(all shards)'}  <- {question}")
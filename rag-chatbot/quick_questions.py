@@ -0,0 +1,32 @@
+"""
+The quick-question buttons of the Streamlit chat, as (button text, question) rows
+Both front ends pre-warm the answer cache with these questions at startup, so
+a click is answered from the cache instead of an OpenAI call.
+"""
+
+# Row 1: Popular categories
+QUICK_QUESTIONS_1 = [
+    ("🏖️ HOT Tours", "Top 5 hottest travel tours from CMP Travel"),
+    ("🏨 5⭐ Resorts", "Best 5-star resorts in Vietnam with spa and casino"),
+    ("💰 Best Prices", "Best tour + hotel combo deals this month"),
+    ("📞 Contact Now", "CMP Travel contact information and office address")
+]
+
+# Row 2: Specific needs
+QUICK_QUESTIONS_2 = [
+    ("👨‍👩‍👧‍👦 Family", "Family tours with children under 12, safe and fun"),
+    ("🏔️ North Vietnam", "Northern Vietnam exploration tour: Hanoi - Sapa - Ha Long 5D4N"),
+    ("🏝️ Pearl Island", "Most beautiful Phu Quoc resorts with private beach and VIP services"),
+    ("💡 Free Advice", "Free consultation for 7-day romantic honeymoon itinerary")
+]
+
+# Row 3: Special services
+QUICK_QUESTIONS_3 = [
+    ("🎯 Personalized", "Design private tours based on personal preferences"),
+    ("✈️ Visa Express", "Fast visa services for Europe and Asia countries"),
+    ("🎉 Events", "Organize team building tours for 50-person companies"),
+    ("🌟 VIP Service", "VIP package: private car, private guide, priority check-in")
+]
+
+QUICK_QUESTIONS = [question for row in (QUICK_QUESTIONS_1, QUICK_QUESTIONS_2, QUICK_QUESTIONS_3)
+                   for _, question in row]
@@ -0,0 +1,68 @@
+"""
+Tests for snapshot updates over the travel knowledge base; run with: python -m pytest rag-chatbot
+"""
+
+import os
+
+import pytest
+
+from knowledge_index import load_documents
+from knowledge_store import MAX_SEGMENTS, Document, KnowledgeSnapshot
+
+KNOWLEDGE_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge-base-travel')
+
+
+@pytest.fixture(scope='module')
+def knowledge():
+    documents, paths = load_documents(KNOWLEDGE_BASE)
+    return KnowledgeSnapshot(Document(os.path.splitext(os.path.basename(path))[0],
+                                      os.path.basename(os.path.dirname(path)), document)
+                             for document, path in zip(documents, paths))
+
+
+@pytest.fixture(scope='module')
+def tour(knowledge):
+    """(doc id, title line) of one individual tour file"""
+    doc_id = sorted(doc_id for doc_id in knowledge.documents if doc_id.startswith('tour_'))[0]
+    return doc_id, knowledge.documents[doc_id].content.strip().splitlines()[0]
+
+
+def live_titles(knowledge, category):
+    return {knowledge.passages[passage_id].title for passage_id in knowledge.shards[category].passage_ids
+            if passage_id not in knowledge.removed}
+
+
+def test_deleting_an_aggregate_keeps_the_individual_tours(knowledge, tour):
+    doc_id, title = tour
+
+    updated, _, _ = knowledge.updated([], ['all_tours'])
+
+    assert 'all_tours' not in updated.documents
+    assert title in live_titles(updated, 'tours')
+    context, _ = updated.context(title, 8, 2000, categories=['tours'])
+    assert title in context
+
+
+def test_a_passage_goes_with_its_last_document(knowledge, tour):
+    doc_id, title = tour
+    without_aggregate, _, _ = knowledge.updated([], ['all_tours'])
+
+    updated, _, removed = without_aggregate.updated([], [doc_id])
+
+    assert removed > 0
+    assert title not in live_titles(updated, 'tours')
+
+
+def test_updates_compact_after_max_segments(knowledge):
+    # Alternating categories: each shard gains a segment every other update, the unsharded index every one
+    documents = [document for document in knowledge.documents.values() if not document.doc_id.startswith('all_')]
+    documents = [next(document for document in documents if document.category == category)
+                 for category in ('tours', 'hotels')]
+
+    updated = knowledge
+    for update in range(MAX_SEGMENTS):
+        document = documents[update % 2]
+        updated, _, _ = updated.updated([document._replace(content=f"{document.content}\nUpdate {update}.")])
+
+    assert len(updated.unsharded.bm25.segments) == 1
+    assert not updated.removed
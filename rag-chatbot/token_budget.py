@@ -0,0 +1,67 @@
+"""
+Token counting for prompt budgets
+Counts with the model's tiktoken encoding (cl100k_base for gpt-3.5-turbo). When
+the encoding can't be loaded (tiktoken missing, or offline before its BPE file
+is cached) it falls back to an estimate that, unlike len(text) // 4, doesn't
+undercount Vietnamese: every non-ASCII character is counted as a token of its
+own, which is about what the encoding does with letters like "ố" or "ữ".
+
+Passage token counts are computed once when the knowledge base is indexed
+(knowledge_store.py); packing a prompt then only adds up cached counts.
+"""
+
+import re
+from functools import lru_cache
+
+DEFAULT_MODEL = 'gpt-3.5-turbo'
+MODEL_CONTEXT_TOKENS = {'gpt-3.5-turbo': 16385}
+MESSAGE_OVERHEAD_TOKENS = 4  # role and delimiters around each chat message
+REPLY_PRIMING_TOKENS = 3
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+def estimate_tokens(text):
+    """~4 ASCII characters per token, plus one token per non-ASCII character"""
+    non_ascii = len(_NON_ASCII.findall(text))
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+
+class TokenCounter:
+    def __init__(self, model=DEFAULT_MODEL):
+        self.model = model
+        try:
+            import tiktoken
+            self._encoding = tiktoken.encoding_for_model(model)
+            self.method = f"tiktoken {self._encoding.name}"
+        except Exception:
+            self._encoding = None
+            self.method = 'estimate'
+
+    def count(self, text):
+        if self._encoding is None:
+            return estimate_tokens(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_messages(self, messages):
+        """Prompt tokens for a chat completion request with these messages"""
+        return sum(MESSAGE_OVERHEAD_TOKENS + self.count(message['content']) for message in messages) \
+            + REPLY_PRIMING_TOKENS
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model=DEFAULT_MODEL):
+    """One shared counter per model; loading an encoding is slow"""
+    return TokenCounter(model)
+
+
+def fit_parts(parts, separator, max_tokens, counter):
+    """The leading whole parts whose join with separator fits in max_tokens"""
+    kept, total = [], 0
+    separator_tokens = counter.count(separator)
+    for part in parts:
+        total += counter.count(part) + (separator_tokens if kept else 0)
+        if total > max_tokens:
+            break
+        kept.append(part)
+    return separator.join(kept)
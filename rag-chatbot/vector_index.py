@@ -0,0 +1,261 @@
+"""
+Dense vector index for semantic retrieval over the travel knowledge base
+Catches paraphrases keyword matching misses ("beach resort" vs "seaside hotel").
+
+The index is built offline and stored as a float32 .npy matrix (one L2-normalized
+row per knowledge base passage, see passages.py) plus meta.json. The chatbots open it
+with mmap, so startup reads no vectors up front and every process on the machine
+shares the same page-cache copy instead of holding its own.
+
+Embedding providers:
+- 'hashing' (default): signed feature hashing of words and character trigrams;
+  offline, dependency-free, deterministic, but only lexical
+- 'sentence-transformers': a local multilingual sentence-transformers model
+  (pip install sentence-transformers; the weights are cached after first download)
+
+Usage:
+    python vector_index.py build --provider hashing
+    python vector_index.py search "seaside hotel with a pool"
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+import argparse
+
+import numpy as np
+
+from knowledge_index import load_documents, tokenize
+from passages import chunk_documents
+
+DEFAULT_INDEX_DIR = os.path.join('indexes', 'vectors')
+DEFAULT_DIMENSIONS = 512
+SEARCH_BLOCK_ROWS = 65536  # rows per batched dot product, bounds scratch memory
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words (weight 1) and their character trigrams (weight 0.5)"""
+
+    name = 'hashing'
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _features(self, text):
+        for word in tokenize(text):
+            yield word, 1.0
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                # crc32 rather than hash(): Python salts str hashes per process
+                h = zlib.crc32(feature.encode('utf-8'))
+                vectors[row, h % self.dimensions] += weight if h & 0x80000000 else -weight
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model; runs offline once the weights are cached"""
+
+    name = 'sentence-transformers'
+
+    def __init__(self, model_name='paraphrase-multilingual-MiniLM-L12-v2'):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self._model = SentenceTransformer(model_name)
+        self.dimensions = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        vectors = self._model.encode(list(texts), batch_size=32, convert_to_numpy=True)
+        return _normalize(vectors.astype(np.float32))
+
+
+EMBEDDERS = {
+    HashingEmbedder.name: HashingEmbedder,
+    SentenceTransformerEmbedder.name: SentenceTransformerEmbedder,
+}
+
+
+def get_embedder(provider, **options):
+    if provider not in EMBEDDERS:
+        raise ValueError(f"Unknown embedding provider: {provider} (available: {', '.join(EMBEDDERS)})")
+    return EMBEDDERS[provider](**options)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def corpus_fingerprint(documents):
+    """Hash of the documents in order; ties the vector rows to the loaded corpus"""
+    digest = hashlib.sha256()
+    for document in documents:
+        digest.update(hashlib.sha256(document.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+
+def build_index(documents, embedder, index_dir=DEFAULT_INDEX_DIR, batch_size=256):
+    """Embed every document and write vectors.npy + meta.json into index_dir"""
+    os.makedirs(index_dir, exist_ok=True)
+    vectors_path = os.path.join(index_dir, 'vectors.npy')
+    tmp_path = vectors_path + '.tmp'
+
+    # Written straight into a memory-mapped file, so the corpus never has to fit in RAM twice
+    matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                       shape=(len(documents), embedder.dimensions))
+    for start in range(0, len(documents), batch_size):
+        matrix[start:start + batch_size] = embedder.embed(documents[start:start + batch_size])
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, vectors_path)
+
+    meta = {
+        'provider': embedder.name,
+        'model': getattr(embedder, 'model_name', None),
+        'dimensions': embedder.dimensions,
+        'documents': len(documents),
+        'fingerprint': corpus_fingerprint(documents),
+    }
+    with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class VectorIndex:
+    def __init__(self, vectors, embedder, appended=None):
+        self.vectors = vectors  # (documents, dimensions) float32, usually a read-only memmap
+        self.embedder = embedder
+        # Rows added by extended(), kept in memory after the memory-mapped ones
+        self.appended = appended if appended is not None else np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self.removed = np.zeros(len(vectors) + len(self.appended), dtype=bool)
+
+    def __len__(self):
+        return len(self.removed)
+
+    def extended(self, documents=(), removed_ids=()):
+        """
+        A new index with documents embedded and appended and removed_ids excluded;
+        the memory-mapped rows stay shared until the next offline build
+        """
+        documents = list(documents)
+        appended = self.appended
+        if documents:
+            appended = np.concatenate([appended, self.embedder.embed(documents).astype(np.float32)])
+        index = VectorIndex(self.vectors, self.embedder, appended)
+        index.removed[:len(self.removed)] = self.removed
+        index.removed[list(removed_ids)] = True
+        return index
+
+    def subset(self, ids):
+        """
+        A VectorIndex over the given rows of the memory-mapped matrix; a contiguous
+        run of ids (a category's passages) stays a view of the same mapping
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) and np.array_equal(ids, np.arange(ids[0], ids[0] + len(ids))):
+            return VectorIndex(self.vectors[ids[0]:ids[0] + len(ids)], self.embedder)
+        return VectorIndex(np.asarray(self.vectors[ids]), self.embedder)
+
+    def _blocks(self):
+        """(first doc id, rows) in slices of at most SEARCH_BLOCK_ROWS"""
+        for offset, matrix in ((0, self.vectors), (len(self.vectors), self.appended)):
+            for start in range(0, len(matrix), SEARCH_BLOCK_ROWS):
+                yield offset + start, matrix[start:start + SEARCH_BLOCK_ROWS]
+
+    @classmethod
+    def open(cls, index_dir=DEFAULT_INDEX_DIR, documents=None):
+        """
+        Memory-map a built index. With documents given, raise ValueError if the
+        index was built from a different corpus (rebuild it with the build command).
+        """
+        with open(os.path.join(index_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if documents is not None and meta['fingerprint'] != corpus_fingerprint(documents):
+            raise ValueError(f"Vector index in {index_dir} is out of date with the knowledge base")
+
+        options = {'dimensions': meta['dimensions']} if meta['provider'] == HashingEmbedder.name \
+            else {'model_name': meta['model']}
+        vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode='r')
+        return cls(vectors, get_embedder(meta['provider'], **options))
+
+    def search(self, query, max_results=3):
+        """Top documents as [(cosine similarity, doc_id)], best first"""
+        if max_results <= 0 or not len(self):
+            return []
+        query_vector = self.embedder.embed([query])[0]
+
+        best_ids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start, rows in self._blocks():
+            scores = rows @ query_vector
+            scores[self.removed[start:start + len(rows)]] = -np.inf
+            if len(scores) > max_results:
+                top = np.argpartition(-scores, max_results - 1)[:max_results]
+            else:
+                top = np.arange(len(scores))
+            best_ids = np.concatenate([best_ids, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+
+        if len(best_ids) > max_results:
+            keep = np.argpartition(-best_scores, max_results - 1)[:max_results]
+            best_ids, best_scores = best_ids[keep], best_scores[keep]
+        order = np.lexsort((best_ids, -best_scores))
+        # Only positive similarities count as relevant, like a zero keyword score
+        return [(float(best_scores[i]), int(best_ids[i])) for i in order if best_scores[i] > 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dense vector index for the knowledge base')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Embed the knowledge base and write the index')
+    build.add_argument('--provider', default='hashing', choices=list(EMBEDDERS))
+    build.add_argument('--model', help='Model name for the sentence-transformers provider')
+    build.add_argument('--dimensions', type=int, default=DEFAULT_DIMENSIONS,
+                       help='Vector size for the hashing provider')
+
+    search = subparsers.add_parser('search', help='Query a built index')
+    search.add_argument('query')
+    search.add_argument('--top-k', type=int, default=3)
+
+    for subparser in (build, search):
+        subparser.add_argument('--knowledge-base', default='knowledge-base-travel')
+        subparser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.knowledge_base):
+        sys.exit(f"Knowledge base not found at {args.knowledge_base}")
+    passages = chunk_documents(load_documents(args.knowledge_base)[0])
+    documents = [passage.text for passage in passages]
+
+    if args.command == 'build':
+        if args.provider == HashingEmbedder.name:
+            embedder = get_embedder(args.provider, dimensions=args.dimensions)
+        else:
+            embedder = get_embedder(args.provider, **({'model_name': args.model} if args.model else {}))
+        started = time.perf_counter()
+        meta = build_index(documents, embedder, args.index_dir)
+        print(f"Indexed {meta['documents']} passages ({meta['provider']}, {meta['dimensions']} dims) "
+              f"into {args.index_dir} in {time.perf_counter() - started:.1f}s")
+    else:
+        index = VectorIndex.open(args.index_dir, documents)
+        started = time.perf_counter()
+        ranked = index.search(args.query, args.top_k)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for score, doc_id in ranked:
+            passage = passages[doc_id]
+            print(f"{score:.3f}  {passage.title} / {passage.section or 'overview'}")
+        print(f"({elapsed_ms:.2f} ms)")
+
+
+if __name__ == '__main__':
+    main()